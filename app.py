@@ -1,26 +1,159 @@
 import os
 import json
+import atexit
+import copy
+import contextvars
+import hashlib
+import heapq
+import logging
+import logging.handlers
 import sqlite3
 import asyncio
-from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Tuple
+import contextlib
+import concurrent.futures
+import queue
+import signal
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timezone, timedelta
+from typing import Any, Callable, Iterable, Optional, List, Dict, Set, Tuple
+from aiohttp import web
 import discord
 from discord import app_commands
 from discord.ext import tasks
 from dotenv import load_dotenv
 
+try:
+    import numpy
+except ImportError:  # Optional; message window sums fall back to pure Python
+    numpy = None
+
+# --- LOGGING ---
+
+LOG_FORMAT = '%(asctime)s %(levelname)-8s %(name)s: %(message)s'
+LOG_REPEAT_WINDOW = 300  # Seconds an identical warning or error is held back after it was logged
+
+log = logging.getLogger('bot')
+database_log = logging.getLogger('bot.database')
+status_log = logging.getLogger('bot.status')
+counts_log = logging.getLogger('bot.messages')
+roles_log = logging.getLogger('bot.roles')
+leaderboard_log = logging.getLogger('bot.leaderboard')
+scheduler_log = logging.getLogger('bot.scheduler')
+metrics_log = logging.getLogger('bot.metrics')
+
+class RepeatFilter(logging.Filter):
+    """Drops repeats of an identical warning or error within LOG_REPEAT_WINDOW.
+
+    The first occurrence after the window closes is let through with the
+    number of repeats that were dropped, so a failure recurring on every
+    status tick produces one line per window instead of one per tick.
+    """
+
+    def __init__(self, window: float = LOG_REPEAT_WINDOW):
+        super().__init__()
+        self.window = window
+        self._seen: Dict[tuple, List] = {}  # (logger, level, message) -> [first logged, suppressed]
+        self._lock = threading.Lock()  # Records also come from the database writer thread
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen and now - seen[0] < self.window:
+                seen[1] += 1
+                return False
+
+            if seen and seen[1]:
+                record.msg = f'{record.getMessage()} (repeated {seen[1]} more times)'
+                record.args = None
+            self._seen[key] = [now, 0]
+
+            if len(self._seen) > 1000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+        return True
+
+def setup_logging(level: str):
+    """Sends every log record through a queue to a listener thread that does the actual I/O.
+
+    Formatting happens on the calling side, so the event loop never waits on
+    a slow or piped stdout.
+    """
+    records: queue.Queue = queue.Queue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.setLevel(level)  # Output is filtered here, so loggers can stay open to in-process handlers
+    queue_handler.addFilter(RepeatFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(records, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # discord.py's debug output (payloads, heartbeats) is only wanted when asked for explicitly
+    logging.getLogger('discord').setLevel(max(logging.INFO, root.level))
+    # Its 429 warnings feed the rate limit metrics whatever LOG_LEVEL is
+    logging.getLogger('discord.http').setLevel(min(logging.WARNING, logging.getLogger('discord').level))
+
 # --- CONFIGURATION ---
 load_dotenv()
 
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+setup_logging(LOG_LEVEL)
+
 DISCORD_BOT_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 DISCORD_CLIENT_ID = os.getenv('DISCORD_CLIENT_ID')
 OWNER_ID = '1081876265683927080'
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'bot_config.db')
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None  # None = Discord's recommendation
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', 'false').lower() in ('1', 'true', 'yes')
 
 if not DISCORD_BOT_TOKEN or not DISCORD_CLIENT_ID:
-    print('❌ ERROR: DISCORD_BOT_TOKEN and DISCORD_CLIENT_ID must be set in .env file')
+    log.critical('DISCORD_BOT_TOKEN and DISCORD_CLIENT_ID must be set in .env file')
     exit(1)
 
-STATUS_UPDATE_INTERVAL = 20  # 20 seconds
+STATUS_UPDATE_INTERVAL = 20  # 20 seconds (polling mode)
+STATUS_EVENT_DRIVEN = os.getenv('STATUS_EVENT_DRIVEN', 'true').lower() not in ('0', 'false', 'no')
+STATUS_DEBOUNCE_SECONDS = 3  # Coalesce presence bursts into one edit
+STATUS_RESYNC_INTERVAL = 300  # 5 minutes safety-net resync in event-driven mode
+# Lean gateway mode: no startup chunking, only staff and top-role holders are cached, no message content
+LEAN_GATEWAY = os.getenv('LEAN_GATEWAY', 'false').lower() in ('1', 'true', 'yes')
+
+DEFAULT_COUNT_WINDOW = '7d'  # Leaderboard and /stats window
+MESSAGE_RETENTION_DAYS = 400  # Hourly message buckets older than this are pruned
+HISTORY_BACKFILL_DAYS = 31  # How far back a newly counted channel is read from history
+MESSAGE_FLUSH_INTERVAL = 15  # Seconds between batched message count flushes
+PRESENCE_FLUSH_INTERVAL = 60  # Seconds between staff presence rollup flushes
+PRESENCE_EVENT_RETENTION_DAYS = 90  # Raw presence transitions older than this are pruned
+PRESENCE_HOURLY_RETENTION_DAYS = 400  # Hourly presence rollups older than this are pruned; daily ones are kept
+HISTORY_SLICE_SECONDS = 6 * 3600  # History backfills are split into 6-hour slices
+HISTORY_SCAN_CONCURRENCY = 4  # Slices fetched at the same time
+HISTORY_PAGE_SIZE = 100  # Messages per history page (and per checkpoint)
+REST_WORKERS = 6  # Outbound REST calls in flight at once
+REST_BULK_CONCURRENCY = 3  # Worker slots bulk work (role sweeps) may occupy
+REST_INTERACTION_RESERVE = 1  # Worker slots only interaction acks and follow-ups may use
+COUNTS_CACHE_TTL = int(os.getenv('COUNTS_CACHE_TTL', '60'))  # Seconds message counts are reused
+
+DEFAULT_LEADERBOARD_SCHEDULE = '30 18 * * 6'  # Saturday 6:30 PM GMT (cron, UTC)
+SCHEDULER_MAX_SLEEP = 3600  # Re-check the wall clock at least hourly
+JOB_RETRY_DELAY = 300  # Seconds before a failed job is retried
+SNAPSHOT_INTERVAL = 300  # Seconds between runtime snapshots (status boards); counts are saved on shutdown
+
+DEFAULT_GUILD_ID = 1349281907765936188  # Shivam's Discord; owns config from single-guild installs
+GLOBAL_GUILD_ID = 0  # Config scope for process-wide settings
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))  # 0 disables the /metrics endpoint
 
 EMOJIS = {
     'offline': '<:offline:1446211386718949497>',
@@ -29,430 +162,2688 @@ EMOJIS = {
     'idle': '<:idle:1446211381354434693>'
 }
 
+DEFAULT_BOARD_NAME = 'main'
+DEFAULT_BOARD_TITLE = '👥 Staff Status Overview'
+# Author block of the original board; kept for it and boards migrated from single-board installs
+LEGACY_BOARD_AUTHOR = {
+    'author_name': "👑 Shivam's Discord",
+    'author_url': 'https://discord.gg/ha7K8ngyex',
+    'author_icon_url': 'https://cdn.discordapp.com/icons/1349281907765936188/7f90f5ba832e7672d4f55eb0c6017813.png'
+}
+
+class StatusBoard:
+    """A staff status message: where it lives, how it looks and who it tracks"""
+
+    COLUMNS = ('board_id', 'guild_id', 'name', 'channel_id', 'message_id', 'title', 'author_name',
+               'author_url', 'author_icon_url', 'emojis', 'group_by', 'page_message_ids')
+    GROUPINGS = ('status', 'role')
+
+    def __init__(self, board_id: int, guild_id: int, name: str, channel_id: Optional[int] = None,
+                 message_id: Optional[int] = None, title: Optional[str] = None, author_name: Optional[str] = None,
+                 author_url: Optional[str] = None, author_icon_url: Optional[str] = None,
+                 emojis: Optional[Dict[str, str]] = None, group_by: Optional[str] = None,
+                 page_message_ids: Optional[List[int]] = None):
+        self.board_id = board_id
+        self.guild_id = guild_id
+        self.name = name
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.title = title or DEFAULT_BOARD_TITLE
+        self.author_name = author_name
+        self.author_url = author_url
+        self.author_icon_url = author_icon_url
+        self.emojis = emojis or {}
+        self.group_by = group_by or 'status'
+        # Messages this bot posted for pages after the first, in page order
+        self.page_message_ids: List[int] = page_message_ids or []
+        self.staff_ids: Set[int] = set()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.channel_id and self.message_id)
+
+    def emoji(self, status: str) -> str:
+        emojis = {**EMOJIS, **self.emojis}
+        return emojis.get(status, emojis['offline'])
+
+# --- METRICS ---
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names: Tuple[str, ...], values: tuple) -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()  # Also updated from the database writer thread
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f'{self.name}{format_labels(self.labels, label_values)} {value}')
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((label_values, list(values)) for label_values, values in self._series.items())
+        for label_values, values in series:
+            bucket_labels = self.labels + ('le',)
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{format_labels(bucket_labels, label_values + (bound,))} {count}')
+            lines.append(f'{self.name}_bucket{format_labels(bucket_labels, label_values + ("+Inf",))} {values[-1]}')
+            lines.append(f'{self.name}_sum{format_labels(self.labels, label_values)} {values[-2]}')
+            lines.append(f'{self.name}_count{format_labels(self.labels, label_values)} {values[-1]}')
+        return lines
+
+class Gauge:
+    """Value sampled when metrics are scraped; collect() returns {label values: value}"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], collect: Callable[[], Dict[tuple, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} gauge']
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{format_labels(self.labels, label_values)} {value}')
+        return lines
+
+# The REST route being requested by the current task, read by the rate limit log handler
+current_route: contextvars.ContextVar = contextvars.ContextVar('current_route', default=('', ''))
+
+class RateLimitLogHandler(logging.Handler):
+    """Counts the 429 responses discord.py logs (and waits out) for the route in flight"""
+
+    def __init__(self, registry: 'Metrics'):
+        super().__init__(logging.WARNING)
+        self.registry = registry
+
+    def emit(self, record: logging.LogRecord):
+        message = str(record.msg)
+        if message.startswith('We are being rate limited.'):
+            method, route = current_route.get()
+            self.registry.rate_limits.inc(method, route)
+            if 'Retrying in' in message:
+                self.registry.rate_limit_wait.inc(method, route, amount=float(record.args[-1]))
+        elif message.startswith('Global rate limit has been hit.'):
+            self.registry.rate_limits.inc('GLOBAL', '')
+
+class Metrics:
+    """Process metrics, served in the Prometheus text format on METRICS_HOST:METRICS_PORT/metrics"""
+
+    def __init__(self):
+        self.status_update = Histogram('bot_status_update_seconds', 'Duration of one guild status board update.')
+        self.member_resolve = Histogram('bot_status_member_resolve_seconds', 'Time spent resolving staff members for a status update.')
+        self.rest_requests = Counter('bot_rest_requests_total', 'Discord REST requests by route and status.', ('method', 'route', 'status'))
+        self.rest_latency = Histogram('bot_rest_request_seconds', 'Discord REST request duration, including rate limit waits.', ('method', 'route'))
+        self.rate_limits = Counter('bot_rest_ratelimited_total', 'Discord 429 responses by route.', ('method', 'route'))
+        self.rate_limit_wait = Counter('bot_rest_ratelimit_wait_seconds_total', 'Seconds spent waiting out 429 responses.', ('method', 'route'))
+        self.history_pages = Counter('bot_history_pages_total', 'Message history pages fetched for backfills.')
+        self.history_messages = Counter('bot_history_messages_total', 'Messages read from channel history for backfills.')
+        self.counts_cache = Counter('bot_counts_cache_requests_total', 'Message count cache lookups.', ('result',))
+        self.db_query = Histogram('bot_db_query_seconds', 'Awaited database call latency, including queue wait.')
+        self.db_transaction = Histogram('bot_db_transaction_seconds', 'Duration of one group-committed writer transaction.')
+        self.leaderboard_update = Histogram('bot_leaderboard_update_seconds', 'Duration of a leaderboard run.')
+        self.jobs = Counter('bot_scheduled_jobs_total', 'Scheduled job runs by kind and result.', ('kind', 'result'))
+        self.rest_coalesced = Counter('bot_rest_coalesced_total', 'Queued REST calls superseded by a newer call for the same target.')
+        self.instruments: list = [
+            self.status_update, self.member_resolve, self.rest_requests, self.rest_latency, self.rate_limits,
+            self.rate_limit_wait, self.history_pages, self.history_messages, self.counts_cache, self.db_query,
+            self.db_transaction, self.leaderboard_update, self.jobs, self.rest_coalesced
+        ]
+        self._runner: Optional[web.AppRunner] = None
+        self._log_handler = RateLimitLogHandler(self)
+
+    def add_gauge(self, name: str, help_text: str, labels: Tuple[str, ...], collect: Callable[[], Dict[tuple, float]]):
+        self.instruments.append(Gauge(name, help_text, labels, collect))
+
+    def render(self) -> str:
+        lines = []
+        for instrument in self.instruments:
+            lines.extend(instrument.render())
+        return '\n'.join(lines) + '\n'
+
+    def instrument_http(self, http):
+        """Wraps discord.py's HTTPClient.request to time and count every REST call by route template"""
+        request = http.request
+
+        async def instrumented_request(route, **kwargs):
+            labels = (route.method, route.path)
+            token = current_route.set(labels)
+            status = 'error'
+            start = time.perf_counter()
+            try:
+                result = await request(route, **kwargs)
+                status = '2xx'
+                return result
+            except discord.HTTPException as error:
+                status = str(error.status)
+                raise
+            finally:
+                self.rest_latency.observe(time.perf_counter() - start, *labels)
+                self.rest_requests.inc(*labels, status)
+                current_route.reset(token)
+
+        http.request = instrumented_request
+        logging.getLogger('discord.http').addHandler(self._log_handler)
+
+    async def start(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        if not port or self._runner:
+            return
+
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8',
+                                headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, host, port).start()
+        except OSError as error:
+            metrics_log.error('Could not listen on %s:%s: %s', host, port, error)
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        metrics_log.info('Serving metrics on http://%s:%s/metrics', host, port)
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+metrics = Metrics()
+
 # --- DATABASE SETUP ---
 class Database:
+    """SQLite store owned by a dedicated writer thread.
+
+    Reads of config and staff are served from write-through in-memory caches.
+    Writes are queued to the writer thread, which group-commits everything that
+    is waiting in one transaction, so nothing blocks the event loop.
+    """
+
     def __init__(self, db_path='bot_config.db'):
         self.db_path = db_path
-        self.conn = None
+        # Write-through caches; every read is served from memory
+        self._config: Dict[int, Dict[str, Any]] = {}
+        self._boards: Dict[int, StatusBoard] = {}
+        self._staff_ids: Dict[int, Set[int]] = {}  # guild -> staff on any of its boards
+        self._queue: queue.Queue = queue.Queue()
+        self._batch: Optional[List[Tuple[str, tuple]]] = None
+        self._batch_depth = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer_loop, name='database-writer', daemon=True)
+        self._thread.start()
         self.init_database()
 
     def init_database(self):
-        self.conn = sqlite3.connect(self.db_path)
-        cursor = self.conn.cursor()
+        self.submit(self._create_schema).result()
+        self._config, self._boards = self.submit(self._read_cache).result()
+        for guild_id in {board.guild_id for board in self._boards.values()}:
+            self._refresh_staff_ids(guild_id)
+        database_log.info('Database initialized successfully')
 
-        cursor.execute('''
+        # Initialize default staff members if database is empty
+        default_staff_ids = [
+            '1081876265683927080', '1403084314819825787', '1193415556402008169',
+            '1317831363474227251', '1408294418695589929', '1355792114818224178',
+            '1231563118455554119', '1033399411130245190', '1180098931280064562',
+            '1228377961569325107', '923488148875526144'
+        ]
+
+        # Initialize the default status board if there are none
+        if not self._boards:
+            board = self.submit(lambda conn: self._insert_board(
+                conn, DEFAULT_GUILD_ID, DEFAULT_BOARD_NAME,
+                channel_id=1445693527274295378, message_id=1458467286187770071, **LEGACY_BOARD_AUTHOR
+            )).result()
+            self._boards[board.board_id] = board
+            with self.batch():
+                for staff_id in default_staff_ids:
+                    self.add_board_staff(board, staff_id)
+            database_log.info('Initialized default status board and staff members')
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        legacy_config = [row[1] for row in conn.execute('PRAGMA table_info(config)')]
+        single_guild = bool(legacy_config) and 'guild_id' not in legacy_config
+        if single_guild:
+            conn.execute('ALTER TABLE config RENAME TO legacy_config')
+
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS config (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
+                guild_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (guild_id, key)
             )
         ''')
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS staff_members (
-                user_id TEXT PRIMARY KEY,
-                added_at INTEGER DEFAULT (strftime('%s', 'now'))
+        # emojis is a JSON object overriding EMOJIS for this board
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS status_boards (
+                board_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                channel_id INTEGER,
+                message_id INTEGER,
+                title TEXT,
+                author_name TEXT,
+                author_url TEXT,
+                author_icon_url TEXT,
+                emojis TEXT,
+                group_by TEXT,
+                page_message_ids TEXT,
+                UNIQUE (guild_id, name)
+            )
+        ''')
+        # Paginated boards: grouping and the extra page messages (a JSON list), added to older tables
+        board_columns = {row[1] for row in conn.execute('PRAGMA table_info(status_boards)')}
+        for column in ('group_by', 'page_message_ids'):
+            if column not in board_columns:
+                conn.execute(f'ALTER TABLE status_boards ADD COLUMN {column} TEXT')
+
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS board_staff (
+                board_id INTEGER NOT NULL REFERENCES status_boards (board_id) ON DELETE CASCADE,
+                user_id INTEGER NOT NULL,
+                added_at INTEGER DEFAULT (strftime('%s', 'now')),
+                PRIMARY KEY (board_id, user_id)
             )
         ''')
 
-        self.conn.commit()
-        print('[DATABASE] Database initialized successfully')
+        if single_guild:
+            Database._migrate_single_guild(conn)
+        elif conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'staff_members'").fetchone():
+            Database._migrate_staff_to_boards(conn, conn.execute(
+                'SELECT guild_id, user_id, added_at FROM staff_members'
+            ).fetchall())
+            conn.execute('DROP TABLE staff_members')
+
+        daily_counts = 'day' in [row[1] for row in conn.execute('PRAGMA table_info(message_counts)')]
+        if daily_counts:
+            conn.execute('ALTER TABLE message_counts RENAME TO legacy_message_counts')
+
+        # hour = hours since the Unix epoch (UTC)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS message_counts (
+                channel_id INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (channel_id, hour, user_id)
+            ) WITHOUT ROWID
+        ''')
 
-        # Initialize default staff members if database is empty
-        default_staff_ids = [
-            '1081876265683927080', '1403084314819825787', '1193415556402008169',
-            '1317831363474227251', '1408294418695589929', '1355792114818224178',
-            '1231563118455554119', '1033399411130245190', '1180098931280064562',
-            '1228377961569325107', '923488148875526144'
-        ]
+        if daily_counts:
+            # Daily totals land in the first hour of their day
+            conn.execute(
+                'INSERT INTO message_counts (channel_id, hour, user_id, count) '
+                'SELECT channel_id, day * 24, user_id, count FROM legacy_message_counts'
+            )
+            conn.execute('DROP TABLE legacy_message_counts')
+            database_log.info('Migrated daily message counts to hourly buckets')
+
+        # Every message up to last_message_id has been counted
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_cursors (
+                channel_id INTEGER PRIMARY KEY,
+                last_message_id INTEGER NOT NULL
+            )
+        ''')
 
-        if len(self.get_staff_ids()) == 0:
-            for staff_id in default_staff_ids:
-                self.add_staff_member(staff_id)
-            print('[DATABASE] Initialized default staff members')
-
-        # Initialize default configuration
-        if not self.get('statusChannelId'):
-            self.set('statusChannelId', '1445693527274295378')
-            self.set('statusMessageId', '1458467286187770071')
-
-    def get(self, key: str, default_value=None):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT value FROM config WHERE key = ?', (key,))
-        result = cursor.fetchone()
-
-        if result:
-            return json.loads(result[0])
-        return default_value
-
-    def set(self, key: str, value):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)',
-            (key, json.dumps(value))
-        )
-        self.conn.commit()
-        print(f'[DATABASE] Updated {key}:', value)
-
-    def get_staff_ids(self) -> List[str]:
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT user_id FROM staff_members')
-        return [row[0] for row in cursor.fetchall()]
-
-    def add_staff_member(self, user_id: str):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'INSERT OR IGNORE INTO staff_members (user_id) VALUES (?)',
-            (user_id,)
+        # In-progress history backfills; cursor is the newest message counted in the slice
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_slices (
+                channel_id INTEGER NOT NULL,
+                slice_start INTEGER NOT NULL,
+                slice_end INTEGER NOT NULL,
+                cursor INTEGER NOT NULL,
+                PRIMARY KEY (channel_id, slice_start)
+            )
+        ''')
+
+        # Times are Unix milliseconds; schedule is a UTC cron expression
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                job_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                schedule TEXT NOT NULL,
+                last_run INTEGER,
+                next_run INTEGER NOT NULL,
+                enabled INTEGER NOT NULL DEFAULT 1,
+                UNIQUE (guild_id, kind)
+            )
+        ''')
+
+        # One row per posted leaderboard; run_at is Unix milliseconds
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_runs (
+                run_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                run_at INTEGER NOT NULL,
+                window_name TEXT NOT NULL,
+                total_messages INTEGER NOT NULL,
+                ranked_users INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS leaderboard_runs_by_guild ON leaderboard_runs (guild_id, run_at)')
+
+        # Every ranked member of a run; guild_id is repeated so a member's history is one index range
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_results (
+                run_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (run_id, user_id)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS leaderboard_results_by_user ON leaderboard_results (guild_id, user_id, run_id)'
         )
-        self.conn.commit()
 
-    def remove_staff_member(self, user_id: str):
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM staff_members WHERE user_id = ?', (user_id,))
-        self.conn.commit()
+        # Append-only log of staff presence transitions; at is Unix seconds, status indexes PRESENCE_STATUSES
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS presence_events (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                at INTEGER NOT NULL,
+                status INTEGER NOT NULL
+            )
+        ''')
 
-    def close(self):
-        if self.conn:
-            self.conn.close()
-            print('[DATABASE] Database closed.')
+        # Seconds each staff member spent in each non-offline status, per UTC hour and per UTC day
+        for table, period in (('presence_hourly', 'hour'), ('presence_daily', 'day')):
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    guild_id INTEGER NOT NULL,
+                    {period} INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    online INTEGER NOT NULL DEFAULT 0,
+                    idle INTEGER NOT NULL DEFAULT 0,
+                    dnd INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (guild_id, {period}, user_id)
+                ) WITHOUT ROWID
+            ''')
+
+        # Runtime state saved for warm restarts; saved_at is Unix milliseconds
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS runtime_snapshots (
+                name TEXT PRIMARY KEY,
+                saved_at INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''')
 
-# Initialize database
-db = Database()
+        # The in-memory message store as column arrays; only valid while the 'message_users' snapshot exists
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS count_snapshots (
+                channel_id INTEGER PRIMARY KEY,
+                hours BLOB NOT NULL,
+                users BLOB NOT NULL,
+                counts BLOB NOT NULL
+            )
+        ''')
 
-# --- UTILITIES ---
+    @staticmethod
+    def _migrate_single_guild(conn: sqlite3.Connection):
+        """Moves config and staff from the old flat tables under the guild they belonged to"""
+        row = conn.execute("SELECT value FROM legacy_config WHERE key = 'guildId'").fetchone()
+        guild_id = int(json.loads(row[0])) if row else DEFAULT_GUILD_ID
 
-def get_emoji(status: str) -> str:
-    return EMOJIS.get(status, EMOJIS['offline'])
+        conn.execute(
+            "INSERT INTO config (guild_id, key, value) SELECT ?, key, value FROM legacy_config WHERE key != 'guildId'",
+            (guild_id,)
+        )
+        staff = conn.execute('SELECT user_id, added_at FROM staff_members').fetchall()
+        Database._migrate_staff_to_boards(conn, [(guild_id, int(user_id), added_at) for user_id, added_at in staff])
+        conn.execute('DROP TABLE legacy_config')
+        conn.execute('DROP TABLE staff_members')
+        database_log.info('Migrated single-guild configuration to guild %s', guild_id)
+
+    @staticmethod
+    def _migrate_staff_to_boards(conn: sqlite3.Connection, staff: List[Tuple[int, int, int]]):
+        """Turns each guild's status message config and staff list into its main board"""
+        status_config: Dict[int, Dict[str, Any]] = {}
+        for guild_id, key, value in conn.execute(
+            "SELECT guild_id, key, value FROM config WHERE key IN ('statusChannelId', 'statusMessageId')"
+        ):
+            status_config.setdefault(guild_id, {})[key] = int(json.loads(value))
+
+        guild_ids = set(status_config) | {guild_id for guild_id, _, _ in staff}
+        boards = {}
+        for guild_id in guild_ids:
+            config = status_config.get(guild_id, {})
+            boards[guild_id] = Database._insert_board(
+                conn, guild_id, DEFAULT_BOARD_NAME,
+                channel_id=config.get('statusChannelId'), message_id=config.get('statusMessageId'),
+                **LEGACY_BOARD_AUTHOR
+            )
 
-def calculate_next_run_time() -> int:
-    """Calculates next Saturday at 6:30 PM GMT (18:30 UTC) and returns timestamp in milliseconds"""
-    now_utc = datetime.now(timezone.utc)
+        conn.executemany(
+            'INSERT OR IGNORE INTO board_staff (board_id, user_id, added_at) VALUES (?, ?, ?)',
+            [(boards[guild_id].board_id, user_id, added_at) for guild_id, user_id, added_at in staff]
+        )
+        conn.execute("DELETE FROM config WHERE key IN ('statusChannelId', 'statusMessageId')")
+        if guild_ids:
+            database_log.info('Migrated status tracking of %d guilds to status boards', len(guild_ids))
+
+    @staticmethod
+    def _insert_board(conn: sqlite3.Connection, guild_id: int, name: str, **fields) -> StatusBoard:
+        board = StatusBoard(None, guild_id, name, **fields)
+        cursor = conn.execute(
+            'INSERT INTO status_boards (guild_id, name, channel_id, message_id, title, author_name, '
+            'author_url, author_icon_url, emojis, group_by, page_message_ids) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (guild_id, name, board.channel_id, board.message_id, board.title, board.author_name,
+             board.author_url, board.author_icon_url, json.dumps(board.emojis), board.group_by,
+             json.dumps(board.page_message_ids))
+        )
+        board.board_id = cursor.lastrowid
+        return board
+
+    @staticmethod
+    def _read_cache(conn: sqlite3.Connection) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, StatusBoard]]:
+        """Loads the config, board and board staff tables for the in-memory caches"""
+        config: Dict[int, Dict[str, Any]] = {}
+        for guild_id, key, value in conn.execute('SELECT guild_id, key, value FROM config'):
+            config.setdefault(guild_id, {})[key] = json.loads(value)
+
+        boards: Dict[int, StatusBoard] = {}
+        for row in conn.execute(f'SELECT {", ".join(StatusBoard.COLUMNS)} FROM status_boards'):
+            fields = dict(zip(StatusBoard.COLUMNS, row))
+            fields['emojis'] = json.loads(fields['emojis']) if fields['emojis'] else {}
+            fields['page_message_ids'] = json.loads(fields['page_message_ids']) if fields['page_message_ids'] else []
+            boards[fields['board_id']] = StatusBoard(**fields)
+
+        for board_id, user_id in conn.execute('SELECT board_id, user_id FROM board_staff'):
+            if board_id in boards:
+                boards[board_id].staff_ids.add(user_id)
+        return config, boards
+
+    # --- Writer thread ---
+
+    def _writer_loop(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        running = True
+        while running:
+            jobs = [self._queue.get()]
+            # Group commit: take everything that queued up while we were busy
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in jobs:
+                running = False
+                jobs = [job for job in jobs if job is not None]
+            if jobs:
+                self._run_jobs(conn, jobs)
+
+        conn.close()
+
+    @staticmethod
+    def _run_jobs(conn: sqlite3.Connection, jobs: list):
+        """Runs queued jobs in one transaction, isolating each job in a savepoint"""
+        results = []
+        start = time.perf_counter()
+        try:
+            conn.execute('BEGIN')
+            for fn, future in jobs:
+                conn.execute('SAVEPOINT job')
+                try:
+                    result = fn(conn)
+                except Exception as error:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                    results.append((future, None, error))
+                else:
+                    conn.execute('RELEASE job')
+                    results.append((future, result, None))
+            conn.execute('COMMIT')
+        except Exception as error:
+            database_log.error('Transaction failed: %s', error)
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            results = [(future, None, error) for _, future in jobs]
+        metrics.db_transaction.observe(time.perf_counter() - start)
+
+        for future, result, error in results:
+            if error is not None:
+                database_log.error('%s', error)
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn) -> concurrent.futures.Future:
+        """Queues fn(conn) for the writer thread; it runs inside a transaction"""
+        future = concurrent.futures.Future()
+        if self._closed:
+            future.set_exception(RuntimeError('Database is closed'))
+            return future
+        self._queue.put((fn, future))
+        return future
+
+    async def run(self, fn):
+        """Runs fn(conn) on the writer thread and awaits its result"""
+        with metrics.db_query.time():
+            return await asyncio.wrap_future(self.submit(fn))
+
+    async def flush(self):
+        """Waits until every write queued so far has been committed"""
+        await self.run(lambda conn: None)
+
+    def _write(self, statements: List[Tuple[str, tuple]]):
+        if self._batch is not None:
+            self._batch.extend(statements)
+            return
+
+        def execute(conn: sqlite3.Connection):
+            for sql, params in statements:
+                conn.execute(sql, params)
+
+        self.submit(execute)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Collects every write made inside the block into a single commit"""
+        if self._batch is None:
+            self._batch = []
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                statements, self._batch = self._batch, None
+                if statements:
+                    self._write(statements)
+
+    # --- Config ---
+
+    def guild_ids(self) -> List[int]:
+        """Every guild with stored configuration"""
+        return [guild_id for guild_id in self._config if guild_id != GLOBAL_GUILD_ID]
+
+    def get(self, guild_id: int, key: str, default_value=None):
+        config = self._config.get(guild_id, {})
+        if key not in config:
+            return default_value
+
+        value = config[key]
+        # Hand out copies of containers so callers cannot mutate the cache
+        if isinstance(value, (list, dict)):
+            return copy.deepcopy(value)
+        return value
+
+    def set(self, guild_id: int, key: str, value):
+        self.set_many(guild_id, {key: value})
+
+    def set_many(self, guild_id: int, values: Dict[str, Any]):
+        """Updates several of a guild's config keys in one transaction"""
+        config = self._config.setdefault(guild_id, {})
+        statements = []
+        for key, value in values.items():
+            config[key] = copy.deepcopy(value)
+            statements.append((
+                'INSERT OR REPLACE INTO config (guild_id, key, value) VALUES (?, ?, ?)',
+                (guild_id, key, json.dumps(value))
+            ))
+            database_log.debug('Updated %s for guild %s: %r', key, guild_id, value)
+        self._write(statements)
+
+    # --- Status boards ---
+
+    def boards(self, guild_id: Optional[int] = None) -> List[StatusBoard]:
+        """Cached boards (all, or one guild's), oldest first"""
+        return sorted(
+            (board for board in self._boards.values() if guild_id is None or board.guild_id == guild_id),
+            key=lambda board: board.board_id
+        )
+
+    def get_board(self, guild_id: int, name: Optional[str] = None) -> Optional[StatusBoard]:
+        """A guild's board by name, or its oldest board when no name is given"""
+        for board in self.boards(guild_id):
+            if name is None or board.name == name:
+                return board
+        return None
+
+    async def create_board(self, guild_id: int, name: str, **fields) -> StatusBoard:
+        board = await self.run(lambda conn: self._insert_board(conn, guild_id, name, **fields))
+        self._boards[board.board_id] = board
+        self._refresh_staff_ids(guild_id)
+        database_log.info('Created status board "%s" for guild %s', name, guild_id)
+        return board
+
+    def update_board(self, board: StatusBoard):
+        """Persists changes made to a cached board"""
+        self._write([(
+            'UPDATE status_boards SET name = ?, channel_id = ?, message_id = ?, title = ?, author_name = ?, '
+            'author_url = ?, author_icon_url = ?, emojis = ?, group_by = ?, page_message_ids = ? WHERE board_id = ?',
+            (board.name, board.channel_id, board.message_id, board.title, board.author_name,
+             board.author_url, board.author_icon_url, json.dumps(board.emojis), board.group_by,
+             json.dumps(board.page_message_ids), board.board_id)
+        )])
+        database_log.info('Updated status board "%s" for guild %s', board.name, board.guild_id)
+
+    def delete_board(self, board: StatusBoard):
+        self._boards.pop(board.board_id, None)
+        self._refresh_staff_ids(board.guild_id)
+        self._write([
+            ('DELETE FROM board_staff WHERE board_id = ?', (board.board_id,)),
+            ('DELETE FROM status_boards WHERE board_id = ?', (board.board_id,))
+        ])
+
+    def _refresh_staff_ids(self, guild_id: int):
+        """Rebuilds a guild's staff set after its boards or their staff change"""
+        self._staff_ids[guild_id] = set().union(*(board.staff_ids for board in self.boards(guild_id)))
+
+    def is_staff_member(self, guild_id: int, user_id: int) -> bool:
+        """Checked on every presence update, so served from a per-guild set"""
+        return user_id in self._staff_ids.get(guild_id, ())
+
+    def add_board_staff(self, board: StatusBoard, user_id):
+        board.staff_ids.add(int(user_id))
+        self._staff_ids.setdefault(board.guild_id, set()).add(int(user_id))
+        self._write([
+            ('INSERT OR IGNORE INTO board_staff (board_id, user_id) VALUES (?, ?)', (board.board_id, int(user_id)))
+        ])
+
+    def remove_board_staff(self, board: StatusBoard, user_id):
+        board.staff_ids.discard(int(user_id))
+        self._refresh_staff_ids(board.guild_id)  # The member may still be on another of the guild's boards
+        self._write([
+            ('DELETE FROM board_staff WHERE board_id = ? AND user_id = ?', (board.board_id, int(user_id)))
+        ])
+
+    # --- Message counts ---
+
+    async def get_ingest_cursor(self, channel_id: int) -> Optional[int]:
+        def query(conn: sqlite3.Connection):
+            row = conn.execute(
+                'SELECT last_message_id FROM ingest_cursors WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+        return await self.run(query)
+
+    @staticmethod
+    def _message_count_statements(counts: Dict[Tuple[int, int, int], int]) -> List[Tuple[str, tuple]]:
+        # Counts written after a message store snapshot make it stale
+        return [("DELETE FROM runtime_snapshots WHERE name = 'message_users'", ())] + [
+            (
+                'INSERT INTO message_counts (channel_id, hour, user_id, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (channel_id, hour, user_id) DO UPDATE SET count = count + excluded.count',
+                (channel_id, hour, user_id, count)
+            )
+            for (channel_id, hour, user_id), count in counts.items()
+        ]
+
+    def add_message_counts(self, counts: Dict[Tuple[int, int, int], int], cursors: Dict[int, int]):
+        """Adds (channel_id, hour, user_id) counts and advances ingest cursors in one commit"""
+        statements = self._message_count_statements(counts)
+        statements.extend(
+            (
+                'INSERT INTO ingest_cursors (channel_id, last_message_id) VALUES (?, ?) '
+                'ON CONFLICT (channel_id) DO UPDATE SET last_message_id = MAX(last_message_id, excluded.last_message_id)',
+                (channel_id, message_id)
+            )
+            for channel_id, message_id in cursors.items()
+        )
+        self._write(statements)
+
+    async def get_scan_slices(self, channel_id: int) -> List[Tuple[int, int, int]]:
+        """Returns (slice_start, slice_end, cursor) for a channel's unfinished backfill"""
+        def query(conn: sqlite3.Connection):
+            return conn.execute(
+                'SELECT slice_start, slice_end, cursor FROM scan_slices WHERE channel_id = ? ORDER BY slice_start',
+                (channel_id,)
+            ).fetchall()
+
+        return await self.run(query)
+
+    def add_scan_slices(self, channel_id: int, slices: List[Tuple[int, int]]):
+        self._write([
+            (
+                'INSERT OR IGNORE INTO scan_slices (channel_id, slice_start, slice_end, cursor) VALUES (?, ?, ?, ?)',
+                (channel_id, start, end, start)
+            )
+            for start, end in slices
+        ])
+
+    def checkpoint_scan_slice(self, channel_id: int, slice_start: int, cursor: int,
+                              counts: Dict[Tuple[int, int, int], int]):
+        """Stores a page of scanned counts together with the slice's new cursor"""
+        statements = self._message_count_statements(counts)
+        statements.append((
+            'UPDATE scan_slices SET cursor = ? WHERE channel_id = ? AND slice_start = ?',
+            (cursor, channel_id, slice_start)
+        ))
+        self._write(statements)
+
+    def complete_scan(self, channel_id: int, cursor: int):
+        """Drops a finished backfill's slices and moves the ingest cursor past it"""
+        self._write([
+            ('DELETE FROM scan_slices WHERE channel_id = ?', (channel_id,)),
+            (
+                'INSERT INTO ingest_cursors (channel_id, last_message_id) VALUES (?, ?) '
+                'ON CONFLICT (channel_id) DO UPDATE SET last_message_id = MAX(last_message_id, excluded.last_message_id)',
+                (channel_id, cursor)
+            )
+        ])
+
+    def prune_message_counts(self, before_hour: int):
+        self._write([('DELETE FROM message_counts WHERE hour < ?', (before_hour,))])
+
+    async def get_message_count_rows(self, channel_id: int, since_hour: int) -> List[Tuple[int, int, int]]:
+        """Returns a channel's (hour, user_id, count) buckets from since_hour onwards, oldest first"""
+        def query(conn: sqlite3.Connection):
+            return conn.execute(
+                'SELECT hour, user_id, count FROM message_counts WHERE channel_id = ? AND hour >= ? ORDER BY hour',
+                (channel_id, since_hour)
+            ).fetchall()
+
+        return await self.run(query)
+
+    # --- Leaderboard history ---
+
+    async def add_leaderboard_run(self, guild_id: int, run_at: int, window_name: str, total_messages: int,
+                                  standings: List[Tuple[int, int, int]]) -> int:
+        """Stores a posted leaderboard with its (user_id, position, count) standings and returns the run ID"""
+        def insert(conn: sqlite3.Connection):
+            run_id = conn.execute(
+                'INSERT INTO leaderboard_runs (guild_id, run_at, window_name, total_messages, ranked_users) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (guild_id, run_at, window_name, total_messages, len(standings))
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO leaderboard_results (run_id, guild_id, user_id, position, count) VALUES (?, ?, ?, ?, ?)',
+                [(run_id, guild_id, user_id, position, count) for user_id, position, count in standings]
+            )
+            return run_id
+
+        return await self.run(insert)
+
+    async def get_leaderboard_history(self, guild_id: int, user_id: int,
+                                      limit: Optional[int] = None) -> List[Tuple[int, str, int, Optional[int], Optional[int]]]:
+        """Returns (run_at, window_name, ranked_users, position, count) for the guild's latest runs, newest first.
+
+        position and count are None for runs the member was not ranked in.
+        """
+        def query(conn: sqlite3.Connection):
+            return conn.execute(
+                'SELECT runs.run_at, runs.window_name, runs.ranked_users, results.position, results.count '
+                'FROM (SELECT run_id, run_at, window_name, ranked_users FROM leaderboard_runs WHERE guild_id = ? '
+                '      ORDER BY run_at DESC LIMIT ?) AS runs '
+                'LEFT JOIN leaderboard_results AS results ON results.run_id = runs.run_id AND results.user_id = ? '
+                'ORDER BY runs.run_at DESC',
+                (guild_id, -1 if limit is None else limit, user_id)
+            ).fetchall()
+
+        return await self.run(query)
+
+    # --- Staff presence ---
+
+    def add_presence(self, events: List[Tuple[int, int, int, int]], hourly: Dict[Tuple[int, int, int], List[int]]):
+        """Appends (guild_id, user_id, at, status) events and adds (guild_id, hour, user_id) seconds to both rollups"""
+        statements = [
+            ('INSERT INTO presence_events (guild_id, user_id, at, status) VALUES (?, ?, ?, ?)', event)
+            for event in events
+        ]
+        daily: Dict[Tuple[int, int, int], List[int]] = {}
+        for (guild_id, hour, user_id), seconds in hourly.items():
+            totals = daily.setdefault((guild_id, hour // 24, user_id), [0, 0, 0])
+            for column, value in enumerate(seconds):
+                totals[column] += value
+
+        for table, period, rows in (('presence_hourly', 'hour', hourly), ('presence_daily', 'day', daily)):
+            statements.extend(
+                (
+                    f'INSERT INTO {table} (guild_id, {period}, user_id, online, idle, dnd) VALUES (?, ?, ?, ?, ?, ?) '
+                    f'ON CONFLICT (guild_id, {period}, user_id) DO UPDATE SET online = online + excluded.online, '
+                    'idle = idle + excluded.idle, dnd = dnd + excluded.dnd',
+                    (guild_id, bucket, user_id, *seconds)
+                )
+                for (guild_id, bucket, user_id), seconds in rows.items()
+            )
+        self._write(statements)
+
+    def prune_presence(self, before_at: int, before_hour: int):
+        self._write([
+            ('DELETE FROM presence_events WHERE at < ?', (before_at,)),
+            ('DELETE FROM presence_hourly WHERE hour < ?', (before_hour,))
+        ])
+
+    async def get_presence_totals(self, guild_id: int, user_ids: Set[int], since_day: int) -> Dict[int, Tuple[int, int, int]]:
+        """Returns {user_id: (online, idle, dnd) seconds} from since_day onwards"""
+        def query(conn: sqlite3.Connection):
+            placeholders = ', '.join('?' * len(user_ids))
+            return conn.execute(
+                f'SELECT user_id, SUM(online), SUM(idle), SUM(dnd) FROM presence_daily '
+                f'WHERE guild_id = ? AND day >= ? AND user_id IN ({placeholders}) GROUP BY user_id',
+                (guild_id, since_day, *user_ids)
+            ).fetchall()
+
+        return {user_id: (online, idle, dnd) for user_id, online, idle, dnd in await self.run(query)}
+
+    async def get_presence_coverage(self, guild_id: int, user_ids: Set[int], since_hour: int) -> Dict[int, int]:
+        """Returns {hour: seconds of staff availability (online or idle) summed over the members} from since_hour on"""
+        def query(conn: sqlite3.Connection):
+            placeholders = ', '.join('?' * len(user_ids))
+            return conn.execute(
+                f'SELECT hour, SUM(online + idle) FROM presence_hourly '
+                f'WHERE guild_id = ? AND hour >= ? AND user_id IN ({placeholders}) GROUP BY hour',
+                (guild_id, since_hour, *user_ids)
+            ).fetchall()
+
+        return dict(await self.run(query))
+
+    # --- Runtime snapshots ---
+
+    def save_snapshot(self, name: str, data: bytes):
+        self._write([(
+            'INSERT INTO runtime_snapshots (name, saved_at, data) VALUES (?, ?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET saved_at = excluded.saved_at, data = excluded.data',
+            (name, int(time.time() * 1000), data)
+        )])
+
+    async def get_snapshot(self, name: str) -> Optional[Tuple[int, bytes]]:
+        """Returns (saved_at, data) for a snapshot, if one was saved"""
+        def query(conn: sqlite3.Connection):
+            return conn.execute('SELECT saved_at, data FROM runtime_snapshots WHERE name = ?', (name,)).fetchone()
+
+        return await self.run(query)
+
+    def save_count_snapshot(self, user_ids: bytes, channels: Dict[int, Tuple[bytes, bytes, bytes]]):
+        """Replaces the message store snapshot; it stays valid until the next message counts are written"""
+        statements = [('DELETE FROM count_snapshots', ())]
+        statements.extend(
+            ('INSERT INTO count_snapshots (channel_id, hours, users, counts) VALUES (?, ?, ?, ?)',
+             (channel_id, hours, users, counts))
+            for channel_id, (hours, users, counts) in channels.items()
+        )
+        statements.append((
+            'INSERT INTO runtime_snapshots (name, saved_at, data) VALUES (?, ?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET saved_at = excluded.saved_at, data = excluded.data',
+            ('message_users', int(time.time() * 1000), user_ids)
+        ))
+        self._write(statements)
+
+    async def take_count_snapshot(self) -> Optional[Tuple[bytes, Dict[int, Tuple[bytes, bytes, bytes]]]]:
+        """Reads and deletes the message store snapshot; None if there is none or it went stale"""
+        def take(conn: sqlite3.Connection):
+            row = conn.execute("SELECT data FROM runtime_snapshots WHERE name = 'message_users'").fetchone()
+            channels = {} if row is None else {
+                channel_id: (hours, users, counts)
+                for channel_id, hours, users, counts in conn.execute(
+                    'SELECT channel_id, hours, users, counts FROM count_snapshots'
+                )
+            }
+            conn.execute("DELETE FROM runtime_snapshots WHERE name = 'message_users'")
+            conn.execute('DELETE FROM count_snapshots')
+            return None if row is None else (row[0], channels)
+
+        return await self.run(take)
+
+    # --- Scheduled jobs ---
+
+    async def get_jobs(self) -> List[tuple]:
+        """Returns (job_id, guild_id, kind, schedule, last_run, next_run, enabled) rows"""
+        def query(conn: sqlite3.Connection):
+            return conn.execute(
+                'SELECT job_id, guild_id, kind, schedule, last_run, next_run, enabled FROM scheduled_jobs'
+            ).fetchall()
+
+        return await self.run(query)
+
+    async def save_job(self, guild_id: int, kind: str, schedule: str, next_run: int) -> int:
+        """Creates or reschedules a guild's job of the given kind and returns its ID"""
+        def upsert(conn: sqlite3.Connection):
+            conn.execute(
+                'INSERT INTO scheduled_jobs (guild_id, kind, schedule, next_run) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (guild_id, kind) DO UPDATE SET '
+                'schedule = excluded.schedule, next_run = excluded.next_run, enabled = 1',
+                (guild_id, kind, schedule, next_run)
+            )
+            return conn.execute(
+                'SELECT job_id FROM scheduled_jobs WHERE guild_id = ? AND kind = ?', (guild_id, kind)
+            ).fetchone()[0]
 
-    # Target: Saturday (5 in Python, 0=Monday) at 18:30 UTC (6:30 PM GMT)
-    target_day = 5  # Saturday
-    target_hour = 18
-    target_minute = 30
+        return await self.run(upsert)
 
-    # Start with today at the target time
-    next_run = now_utc.replace(hour=target_hour, minute=target_minute, second=0, microsecond=0)
+    def update_job_run(self, job_id: int, last_run: Optional[int], next_run: int):
+        self._write([
+            ('UPDATE scheduled_jobs SET last_run = ?, next_run = ? WHERE job_id = ?', (last_run, next_run, job_id))
+        ])
 
-    # Calculate days until next Saturday
-    current_weekday = now_utc.weekday()
-    days_ahead = (target_day - current_weekday) % 7
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        database_log.info('Database closed.')
+
+# Initialize database
+db = Database(DATABASE_PATH)
 
-    # If today is Saturday but the time has passed, schedule for next Saturday
-    if days_ahead == 0:
-        current_minutes = now_utc.hour * 60 + now_utc.minute
-        target_minutes = target_hour * 60 + target_minute
-        if current_minutes >= target_minutes:
-            days_ahead = 7
+# --- UTILITIES ---
 
-    # If days_ahead is 0 and we haven't passed the time, keep it as today
-    # Otherwise add the days
-    if days_ahead > 0:
-        next_run += timedelta(days=days_ahead)
+def render_fingerprint(*parts) -> str:
+    """Hashes the rendered pieces of a message so unchanged content can be detected"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+class CronSchedule:
+    """Minimal five-field cron expression (minute hour day-of-month month day-of-week), in UTC.
+
+    Fields accept *, numbers, ranges (a-b), lists (a,b) and steps (*/n, a-b/n,
+    and a/n, which runs from a to the end of the field's range).
+    Day of week runs 0-6 from Sunday (7 is also Sunday). As in cron, when both
+    day fields are restricted a day matches if either one does.
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError('A cron schedule needs exactly five fields: minute hour day month weekday')
+
+        self.expression = ' '.join(fields)
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> List[int]:
+        values = set()
+        for part in field.split(','):
+            step = 1
+            stepped = '/' in part
+            if stepped:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f'Invalid step in cron field "{field}"')
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if stepped else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f'Cron field "{field}" must be within {low}-{high}')
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        # Python weekday() is Monday=0; cron is Sunday=0
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_match or weekday_match
+        if self.days_restricted:
+            return day_match
+        if self.weekdays_restricted:
+            return weekday_match
+        return True
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after moment"""
+        start = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f'Cron schedule "{self.expression}" never fires')
+
+def calculate_next_run_time(schedule: str = DEFAULT_LEADERBOARD_SCHEDULE) -> int:
+    """Calculates the next run of a cron schedule (default: Saturday 18:30 UTC) and returns timestamp in milliseconds"""
+    now_utc = datetime.now(timezone.utc)
+    next_run = CronSchedule(schedule).next_after(now_utc)
 
     timestamp = int(next_run.timestamp() * 1000)
 
-    print(f'[SCHEDULER] Current time: {now_utc.strftime("%a, %d %b %Y %H:%M:%S UTC")}')
-    print(f'[SCHEDULER] Next run time: {next_run.strftime("%a, %d %b %Y %H:%M:%S UTC")}')
+    scheduler_log.debug('Current time: %s, next run time: %s',
+                        now_utc.strftime('%a, %d %b %Y %H:%M:%S UTC'), next_run.strftime('%a, %d %b %Y %H:%M:%S UTC'))
 
     return timestamp
 
 # --- BOT CLIENT ---
 
-class DiscordBot(discord.Client):
+class BoardState:
+    """Last rendered state of one status board"""
+
+    def __init__(self):
+        self.fingerprints: Dict[int, str] = {}  # page index -> fingerprint of its last queued edit
+        self.confirmed: Dict[int, str] = {}  # page index -> fingerprint Discord has acknowledged
+        self.available_ids: Set[int] = set()
+
+class DiscordBot(discord.AutoShardedClient):
     def __init__(self):
         intents = discord.Intents.default()
         intents.members = True
         intents.messages = True
-        intents.message_content = True
+        intents.message_content = not LEAN_GATEWAY  # Counting only needs message authors
         intents.presences = True
 
-        super().__init__(intents=intents)
+        if LEAN_GATEWAY:
+            # Nothing is cached by default; resolve_staff_members and the role sweep query the members
+            # they need with cache=True, and presence updates are only dispatched for cached members
+            super().__init__(intents=intents, shard_count=SHARD_COUNT, chunk_guilds_at_startup=False,
+                             member_cache_flags=discord.MemberCacheFlags.none())
+        else:
+            super().__init__(intents=intents, shard_count=SHARD_COUNT)
         self.tree = app_commands.CommandTree(self)
+        metrics.instrument_http(self.http)
+        metrics.add_gauge('bot_gateway_latency_seconds', 'Gateway heartbeat latency per shard.', ('shard',),
+                          lambda: {(shard_id,): latency for shard_id, latency in self.latencies if latency == latency})
+        metrics.add_gauge('bot_cached_members', 'Guild members held in the member cache.', (),
+                          lambda: {(): sum(len(guild.members) for guild in self.guilds)})
+
+        # Event-driven status board state
+        self.board_states: Dict[int, BoardState] = {}
+        self.absent_staff_ids: Dict[int, Set[int]] = {}  # guild -> staff not in the guild
+        self.status_lock = asyncio.Lock()
+        self.presence_text: Optional[str] = None
+        self._dirty_guilds: Set[int] = set()
+        self._status_dirty = asyncio.Event()
+        self._status_flusher_task = None
+        self._shutdown_task: Optional[asyncio.Task] = None
+        self._shutting_down = False
 
     async def setup_hook(self):
+        await metrics.start()
+        # Before the gateway connects, so the first shard's backfill and status tick already see it
+        await load_runtime_snapshot(self)
+        await self.sync_commands(force=FORCE_COMMAND_SYNC)
+        with contextlib.suppress(NotImplementedError):  # No signal handlers on Windows
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._on_sigterm)
+
+    def _on_sigterm(self):
+        # Held on self: the loop only keeps a weak reference to tasks
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self.shutdown('SIGTERM'))
+
+    async def shutdown(self, reason: str):
+        """Stops background work, flushes counts, saves a runtime snapshot and disconnects"""
+        if self._shutting_down:
+            return
+        self._shutting_down = True
+        log.warning('Shutting down (%s)', reason)
+
+        job_scheduler.stop()
+        self.snapshot_saver.cancel()
+
+        if self.status_updater.is_running():
+            self.status_updater.cancel()
+            status_log.info('Status updater stopped.')
+
+        if self._status_flusher_task and not self._status_flusher_task.done():
+            self._status_flusher_task.cancel()
+
+        if self.message_flusher.is_running():
+            self.message_flusher.cancel()
+        await message_counter.flush()
+        self.presence_flusher.cancel()
+        await presence_tracker.flush()
+
+        save_runtime_snapshot(self)
+        await db.flush()
+        db.close()
+
+        rest_queue.stop()
+        await metrics.stop()
+        await self.close()
+
+    def command_fingerprint(self) -> str:
+        """Hash of the command definitions as they would be sent to Discord"""
+        payload = sorted((command.to_dict(self.tree) for command in self.tree.get_commands()),
+                         key=lambda command: (command['name'], command.get('type', 1)))
+        encoded = json.dumps([DISCORD_CLIENT_ID, payload], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    async def sync_commands(self, force: bool = False) -> bool:
+        """Uploads the command tree unless Discord already has these exact definitions"""
+        fingerprint = self.command_fingerprint()
+        if not force and db.get(GLOBAL_GUILD_ID, 'commandTreeHash') == fingerprint:
+            log.info('Application commands unchanged (%s), skipping sync.', fingerprint[:12])
+            return False
+
         await self.tree.sync()
-        print('[COMMANDS] Successfully registered application commands.')
+        db.set(GLOBAL_GUILD_ID, 'commandTreeHash', fingerprint)
+        log.info('Successfully registered application commands (%s).', fingerprint[:12])
+        return True
+
+    async def on_shard_ready(self, shard_id: int):
+        log.info('Shard %s ready', shard_id)
+
+        # A fresh session identifies with the constructor's activity, not the last change_presence
+        self.presence_text = None
+        try:
+            await update_presence(self)
+        except Exception as err:
+            status_log.warning('Could not restore presence on shard %s: %s', shard_id, err)
+
+        # A new session starts with an empty member cache in lean mode, so staff are queried again
+        if LEAN_GATEWAY:
+            for guild in self.guilds:
+                if guild.shard_id == shard_id and db.boards(guild.id):
+                    self.absent_staff_ids.pop(guild.id, None)
+                    self.request_status_update(guild.id)
+
+        # Anything sent while this shard was offline gets backfilled once; other shards kept receiving
+        for guild_id in db.guild_ids():
+            if not db.get(guild_id, 'setupComplete', False) or (guild_id >> 22) % (self.shard_count or 1) != shard_id:
+                continue
+            guild = self.get_guild(guild_id)
+            channels = source_channels(guild) if guild else []
+            channel_ids = set(source_channel_ids(guild_id)) | {channel.id for channel in channels}
+            message_counter.start_session(channel_ids)
+            for channel_id in channel_ids:
+                await message_counter.track(channel_id)
+            for channel in channels:
+                start_message_sync(channel)
 
     async def on_ready(self):
-        print(f'✓ Bot logged in as {self.user}')
-
-        # Initialize next run timestamp if not set
-        setup_complete = db.get('setupComplete', False)
-        if setup_complete:
-            next_run = db.get('nextRunTimestamp')
-            if not next_run:
-                timestamp = calculate_next_run_time()
-                db.set('nextRunTimestamp', timestamp)
-                print(f'[SCHEDULER] Initialized next run timestamp: {timestamp}')
-
-        # Start scheduler checker
-        if not self.scheduler_checker.is_running():
-            self.scheduler_checker.start()
-            print('[SCHEDULER] Scheduler checker started')
-
-        # Start status updates
+        log.info('Bot logged in as %s (%s shards, %d guilds)', self.user, self.shard_count, len(self.guilds))
+
+        if not self.message_flusher.is_running():
+            self.message_flusher.start()
+        if not self.presence_flusher.is_running():
+            self.presence_flusher.start()
+        if not self.snapshot_saver.is_running():
+            self.snapshot_saver.start()
+
+        # Start the job scheduler (runs anything missed while offline once)
+        await job_scheduler.start()
+
+        # Start the debounced status flusher
+        if not self._status_flusher_task or self._status_flusher_task.done():
+            self._status_flusher_task = asyncio.create_task(self.status_flusher())
+            status_log.info('Status flusher started')
+
+        # Start status updates (slow safety-net resync when event-driven)
         if not self.status_updater.is_running():
+            if STATUS_EVENT_DRIVEN:
+                self.status_updater.change_interval(seconds=STATUS_RESYNC_INTERVAL)
             self.status_updater.start()
-            print('[STATUS] Status updater started')
-
-    @tasks.loop(seconds=30)  # Check every 30 seconds
-    async def scheduler_checker(self):
-        """Checks if it's time to run the leaderboard based on stored timestamp"""
-        setup_complete = db.get('setupComplete', False)
-        
-        if not setup_complete:
+            mode = 'event-driven' if STATUS_EVENT_DRIVEN else 'polling'
+            status_log.info('Status updater started (%s mode)', mode)
+
+    async def on_message(self, message: discord.Message):
+        message_counter.record(message)
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.cached_message:
+            message_counter.forget(payload.cached_message)
+
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        for message in payload.cached_messages:
+            message_counter.forget(message)
+
+    async def on_member_join(self, member: discord.Member):
+        absent = self.absent_staff_ids.get(member.guild.id, set())
+        if member.id in absent:
+            absent.discard(member.id)
+            self.request_status_update(member.guild.id)
+
+    async def on_presence_update(self, before: discord.Member, after: discord.Member):
+        if before.status == after.status or not db.is_staff_member(after.guild.id, after.id):
             return
 
-        next_run_timestamp = db.get('nextRunTimestamp')
-        if not next_run_timestamp:
-            print('[SCHEDULER] No next run timestamp found, calculating...')
-            next_run_timestamp = calculate_next_run_time()
-            db.set('nextRunTimestamp', next_run_timestamp)
+        presence_tracker.observe(after.guild.id, after.id, str(after.status))
+        if STATUS_EVENT_DRIVEN:
+            self.request_status_update(after.guild.id)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if not STATUS_EVENT_DRIVEN or before.roles == after.roles:
             return
 
-        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
-        
-        # Check if we've passed the scheduled time
-        if now_ms >= next_run_timestamp:
-            print(f'[SCHEDULER] Time to run! Current: {now_ms}, Scheduled: {next_run_timestamp}')
-            try:
-                print('[SCHEDULER] Executing scheduled leaderboard update...')
-                await run_leaderboard_update(self, False, None)
-                print('[SCHEDULER] Scheduled leaderboard update completed successfully')
-                
-                # Calculate and set next run time
-                next_timestamp = calculate_next_run_time()
-                db.set('nextRunTimestamp', next_timestamp)
-                db.set('lastRunTimestamp', now_ms)
-                print(f'[SCHEDULER] Next run scheduled for: {datetime.fromtimestamp(next_timestamp/1000, timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")}')
-                
-            except Exception as error:
-                print(f'[SCHEDULER ERROR] Failed to run scheduled update: {error}')
-                import traceback
-                traceback.print_exc()
+        # Only role-grouped boards render roles
+        if any(board.group_by == 'role' and after.id in board.staff_ids for board in db.boards(after.guild.id)):
+            self.request_status_update(after.guild.id)
+
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        # Username changes arrive here, not in on_member_update (members share the updated user object)
+        if not STATUS_EVENT_DRIVEN or before.name == after.name:
+            return
+
+        for guild_id in {board.guild_id for board in db.boards() if after.id in board.staff_ids}:
+            self.request_status_update(guild_id)
+
+    def board_state(self, board_id: int) -> BoardState:
+        if board_id not in self.board_states:
+            self.board_states[board_id] = BoardState()
+        return self.board_states[board_id]
+
+    def request_status_update(self, guild_id: int):
+        """Marks a guild's status boards dirty so the flusher pushes one coalesced edit each"""
+        self._dirty_guilds.add(guild_id)
+        self._status_dirty.set()
+
+    async def status_flusher(self):
+        """Waits for boards to be marked dirty, then debounces and pushes a single edit per board"""
+        while not self.is_closed():
+            await self._status_dirty.wait()
+            await asyncio.sleep(STATUS_DEBOUNCE_SECONDS)
+            self._status_dirty.clear()
+            dirty, self._dirty_guilds = self._dirty_guilds, set()
+            for guild_id in dirty:
+                try:
+                    await update_status(self, guild_id)
+                except Exception as err:
+                    # A dead flusher would silently stop event-driven updates
+                    status_log.exception('Status flush failed for guild %s: %s', guild_id, err)
+
+    @tasks.loop(seconds=MESSAGE_FLUSH_INTERVAL)
+    async def message_flusher(self):
+        """Writes buffered live message counts to the database in one batch"""
+        await message_counter.flush()
+
+    @tasks.loop(seconds=PRESENCE_FLUSH_INTERVAL)
+    async def presence_flusher(self):
+        """Writes staff presence transitions and rollup increments to the database in one batch"""
+        await presence_tracker.flush()
+
+    @tasks.loop(seconds=SNAPSHOT_INTERVAL)
+    async def snapshot_saver(self):
+        """Periodically saves status board state, so even a crash restarts with recent fingerprints"""
+        save_status_snapshot(self)
 
     @tasks.loop(seconds=STATUS_UPDATE_INTERVAL)
     async def status_updater(self):
-        await update_status(self)
+        for guild_id in sorted({board.guild_id for board in db.boards() if board.configured}):
+            await update_status(self, guild_id)
 
 client = DiscordBot()
 
+# --- OUTBOUND REQUESTS ---
+
+PRIORITY_INTERACTION = 0  # Interaction defers and follow-ups
+PRIORITY_BOARD = 1  # Status board edits and leaderboard posts
+PRIORITY_BULK = 2  # Role sweeps and other background work
+
+class QueuedRequest:
+    def __init__(self, priority: int, factory: Callable, key: Optional[tuple]):
+        self.priority = priority
+        self.factory = factory
+        self.key = key
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class RestQueue:
+    """Outbound REST scheduler shared by every part of the bot.
+
+    Calls run on REST_WORKERS workers in priority order. Bulk work never
+    holds more than REST_BULK_CONCURRENCY of them, so board edits find a free
+    slot during a large role sweep, and board and bulk work together leave
+    REST_INTERACTION_RESERVE free, so an interaction ack is never stuck behind
+    calls sleeping out a 429 for its 3-second deadline. A call submitted
+    with the key of one that is still waiting replaces it: the request keeps
+    its place in the queue but sends the newest payload, and every caller
+    gets that result.
+    """
+
+    def __init__(self, workers: int = REST_WORKERS, bulk_concurrency: int = REST_BULK_CONCURRENCY,
+                 interaction_reserve: int = REST_INTERACTION_RESERVE):
+        self.worker_count = workers
+        self.bulk_concurrency = bulk_concurrency
+        self.background_concurrency = max(1, workers - interaction_reserve)
+        self._heap: List[Tuple[int, int, QueuedRequest]] = []
+        self._pending: Dict[tuple, QueuedRequest] = {}
+        self._sequence = 0
+        self._bulk_running = 0
+        self._background_running = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        metrics.add_gauge('bot_rest_queue_depth', 'REST calls waiting in the outbound queue.', ('priority',),
+                          lambda: self.depths())
+
+    def depths(self) -> Dict[tuple, int]:
+        depths: Dict[tuple, int] = {}
+        for priority, _, _ in self._heap:
+            depths[(priority,)] = depths.get((priority,), 0) + 1
+        return depths
+
+    def submit(self, priority: int, factory: Callable, key: Optional[tuple] = None) -> asyncio.Future:
+        """Queues factory() (a coroutine function making one REST call) and returns a future for its result"""
+        self._ensure_workers()
+
+        queued = self._pending.get(key) if key is not None else None
+        if queued:
+            queued.factory = factory
+            metrics.rest_coalesced.inc()
+        else:
+            queued = QueuedRequest(priority, factory, key)
+            if key is not None:
+                self._pending[key] = queued
+            self._sequence += 1
+            heapq.heappush(self._heap, (priority, self._sequence, queued))
+            self._wakeup.set()
+
+        # Shielded so one caller giving up does not cancel the call for everyone else
+        return asyncio.shield(queued.future)
+
+    async def call(self, priority: int, factory: Callable, key: Optional[tuple] = None):
+        return await self.submit(priority, factory, key)
+
+    def _ensure_workers(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def _runnable(self) -> bool:
+        if not self._heap:
+            return False
+        priority = self._heap[0][0]
+        if priority == PRIORITY_INTERACTION:
+            return True
+        if self._background_running >= self.background_concurrency:
+            return False
+        return priority < PRIORITY_BULK or self._bulk_running < self.bulk_concurrency
+
+    async def _worker(self):
+        while True:
+            while not self._runnable():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            priority, _, queued = heapq.heappop(self._heap)
+            if queued.key is not None:
+                self._pending.pop(queued.key, None)
+            background = priority > PRIORITY_INTERACTION
+            bulk = priority >= PRIORITY_BULK
+            self._background_running += background
+            self._bulk_running += bulk
+
+            try:
+                result = await queued.factory()
+            except Exception as error:
+                if not queued.future.done():
+                    queued.future.set_exception(error)
+                    queued.future.exception()  # Marks it retrieved when every caller has given up
+            else:
+                if not queued.future.done():
+                    queued.future.set_result(result)
+            finally:
+                self._background_running -= background
+                self._bulk_running -= bulk
+                if background:
+                    self._wakeup.set()
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        for _, _, queued in self._heap:
+            queued.future.cancel()
+        self._heap.clear()
+        self._pending.clear()
+
+rest_queue = RestQueue()
+
 # --- STATUS TRACKING ---
 
-async def update_status(bot: DiscordBot):
-    if not bot.is_ready():
-        print('[STATUS] Bot not ready yet')
+MEMBER_QUERY_BATCH = 100  # Gateway limit for user IDs per member chunk request
+
+async def resolve_staff_members(bot: DiscordBot, guild: discord.Guild, staff_ids: Set[int]) -> Dict[int, discord.Member]:
+    """Resolves staff from the member cache, fetching any misses in one gateway chunk request.
+
+    Fetched members (with presences) are cached by discord.py. IDs the gateway
+    reports as not being guild members are remembered in bot.absent_staff_ids
+    so they are not requested again every tick.
+    """
+    absent_ids = bot.absent_staff_ids.setdefault(guild.id, set())
+    members = {}
+    missing = []
+    for user_id in staff_ids:
+        member = guild.get_member(user_id)
+        if member:
+            members[user_id] = member
+        elif user_id not in absent_ids:
+            missing.append(user_id)
+
+    for start in range(0, len(missing), MEMBER_QUERY_BATCH):
+        batch = missing[start:start + MEMBER_QUERY_BATCH]
+        try:
+            found = await guild.query_members(user_ids=batch, limit=len(batch), presences=True, cache=True)
+        except asyncio.TimeoutError:
+            status_log.warning('Timed out resolving %d staff members', len(batch))
+            continue
+
+        for member in found:
+            members[member.id] = member
+        absent = set(batch) - {member.id for member in found}
+        if absent:
+            status_log.info('Staff not in guild, skipping until they rejoin: %s', sorted(absent))
+            absent_ids.update(absent)
+
+    return members
+
+async def update_presence(bot: DiscordBot):
+    """Shows the number of distinct available staff across every board, skipping no-op updates"""
+    available_ids = set()
+    for board in db.boards():
+        if board.board_id in bot.board_states:
+            available_ids |= bot.board_states[board.board_id].available_ids
+
+    presence_text = f"{len(available_ids)} staff available"
+    if presence_text == bot.presence_text:
         return
 
-    try:
-        status_channel_id = db.get('statusChannelId')
-        status_message_id = db.get('statusMessageId')
-        staff_ids = db.get_staff_ids()
+    await bot.change_presence(
+        activity=discord.CustomActivity(name=presence_text),
+        status=discord.Status.online
+    )
+    bot.presence_text = presence_text
+
+async def update_status(bot: DiscordBot, guild_id: int):
+    if not bot.is_ready():
+        status_log.debug('Bot not ready yet')
+        return
 
-        if not status_channel_id or not status_message_id:
-            print('[STATUS] Status tracking not configured')
+    start = time.perf_counter()
+    edits = []
+    async with bot.status_lock:
+        boards = [board for board in db.boards(guild_id) if board.configured]
+        if not boards:
+            status_log.debug('Status tracking not configured for guild %s', guild_id)
             return
 
-        channel = bot.get_channel(int(status_channel_id))
+        try:
+            # One member resolution for every board in the guild
+            guild = bot.get_guild(guild_id)
+            staff_ids = set().union(*(board.staff_ids for board in boards))
+            with metrics.member_resolve.time():
+                members = await resolve_staff_members(bot, guild, staff_ids) if guild else {}
+            for user_id, member in members.items():
+                presence_tracker.observe(guild_id, user_id, str(member.status))
+
+            for board in boards:
+                edits.extend(await update_board(bot, board, members))
+
+            await update_presence(bot)
+        except Exception as err:
+            status_log.exception('Status update failed for guild %s: %s', guild_id, err)
+
+    # Edits wait in the REST queue outside the lock, so the next tick can replace a still-queued one
+    await asyncio.gather(*edits)
+    metrics.status_update.observe(time.perf_counter() - start)
+
+BOARD_FIELD_LIMIT = 1024  # Characters in one embed field value
+BOARD_PAGE_FIELDS = 25  # Fields in one embed
+BOARD_PAGE_CHARS = 5000  # Field characters per page, leaving room for title, author and footer within 6000
+
+def board_sections(board: StatusBoard, members: Dict[int, discord.Member]) -> Tuple[List[Tuple[str, List[str]]], Set[int]]:
+    """Groups a board's staff into titled sections of lines; returns them with the available staff IDs"""
+    available_ids = set()
+    available = []
+    unavailable = []
+    groups: Dict[Tuple[int, int], Tuple[str, List[str], List[str]]] = {}  # role order -> (name, available, others)
+
+    for user_id in sorted(board.staff_ids):
+        member = members.get(user_id)
+        if not member:
+            unavailable.append(f"❌ <@{user_id}> (`User Data Unavailable`)")
+            continue
+
+        status = str(member.status) if hasattr(member, 'status') and member.status else 'offline'
+        line = f"{board.emoji(status)} <@{member.id}> (`{member.name}`)"
+        is_available = status in ['online', 'idle']
+        if is_available:
+            available_ids.add(member.id)
+
+        if board.group_by == 'role':
+            role = member.top_role
+            _, role_available, role_others = groups.setdefault(
+                (-role.position, role.id), ('Members' if role.is_default() else role.name, [], [])
+            )
+            (role_available if is_available else role_others).append(line)
+        elif is_available:
+            available.append(line)
+        else:
+            unavailable.append(line)
+
+    if board.group_by != 'role':
+        return [
+            ('Available Staff:', available or ['*No staff available.*']),
+            ('Unavailable Staff:', unavailable or ['*No staff unavailable.*'])
+        ], available_ids
+
+    sections = [
+        (f'{name} ({len(role_available)}/{len(role_available) + len(role_others)} available)', role_available + role_others)
+        for name, role_available, role_others in (groups[key] for key in sorted(groups))
+    ]
+    if unavailable:
+        sections.append(('User Data Unavailable', unavailable))
+    return sections or [('Staff', ['*No staff tracked.*'])], available_ids
+
+def paginate_board(sections: List[Tuple[str, List[str]]]) -> List[List[Tuple[str, str]]]:
+    """Packs sections into fields of at most BOARD_FIELD_LIMIT characters, and fields into embed-sized pages"""
+    fields = []
+    for title, lines in sections:
+        name = title
+        chunk = []
+        size = 0
+        for line in lines:
+            if chunk and size + len(line) + 1 > BOARD_FIELD_LIMIT:
+                fields.append((name, '\n'.join(chunk)))
+                name = '\u200b'  # Continuations have a blank name, so only the section's first field carries counts
+                chunk = []
+                size = 0
+            chunk.append(line)
+            size += len(line) + 1
+        fields.append((name, '\n'.join(chunk)))
+
+    pages = [[]]
+    size = 0
+    for name, value in fields:
+        if pages[-1] and (len(pages[-1]) == BOARD_PAGE_FIELDS or size + len(name) + len(value) > BOARD_PAGE_CHARS):
+            pages.append([])
+            size = 0
+        pages[-1].append((name, value))
+        size += len(name) + len(value)
+    return pages
+
+async def ensure_board_pages(board: StatusBoard, channel: discord.abc.Messageable, page_count: int) -> List[int]:
+    """Posts page messages until the board has one per page; returns the message IDs in page order.
+
+    Surplus pages are kept (rendered empty) rather than deleted, so a board
+    hovering around a page boundary does not repost messages on every change.
+    """
+    while len(board.page_message_ids) < page_count - 1:
+        message = await rest_queue.call(PRIORITY_BOARD, lambda: channel.send(
+            embed=discord.Embed(color=0x808080, title=board.title)
+        ))
+        board.page_message_ids.append(message.id)
+        db.update_board(board)
+    return [board.message_id] + board.page_message_ids
+
+async def delete_page_messages(bot: DiscordBot, channel_id: int, message_ids: List[int]):
+    """Deletes page messages a board no longer uses; a board's first message is never passed here"""
+    channel = bot.get_partial_messageable(channel_id)
+    for message_id in message_ids:
+        try:
+            await rest_queue.call(PRIORITY_BULK, lambda: channel.get_partial_message(message_id).delete())
+        except discord.HTTPException as error:
+            status_log.warning('Could not delete page message %s in channel %s: %s', message_id, channel_id, error)
+
+async def update_board(bot: DiscordBot, board: StatusBoard, members: Dict[int, discord.Member]) -> list:
+    """Renders a board and queues edits of the pages whose content changed; returns the edits to await"""
+    state = bot.board_state(board.board_id)
+    try:
+        channel = bot.get_channel(board.channel_id)
         if not channel:
-            print(f'[STATUS] Fetching channel {status_channel_id}')
-            channel = await bot.fetch_channel(int(status_channel_id))
-
-        guild = channel.guild
-        available = []
-        unavailable = []
-
-        for user_id in staff_ids:
-            try:
-                member = guild.get_member(int(user_id))
-                if not member:
-                    member = await guild.fetch_member(int(user_id))
-
-                status = str(member.status) if hasattr(member, 'status') and member.status else 'offline'
-                line = f"{get_emoji(status)} <@{member.id}> (`{member.name}`)"
-
-                if status in ['online', 'idle']:
-                    available.append(line)
-                else:
-                    unavailable.append(line)
-            except Exception as e:
-                print(f"[STATUS] Error fetching member {user_id}: {e}")
-                unavailable.append(f"❌ <@{user_id}> (`User Data Unavailable`)")
-
-        await bot.change_presence(
-            activity=discord.CustomActivity(name=f"{len(available)} staff available"),
-            status=discord.Status.online
-        )
+            status_log.debug('Fetching channel %s', board.channel_id)
+            channel = await bot.fetch_channel(board.channel_id)
+
+        sections, state.available_ids = board_sections(board, members)
+        pages = paginate_board(sections)
+        message_ids = await ensure_board_pages(board, channel, len(pages))
+        pages.extend([('\u200b', '*No more staff.*')] for _ in range(len(message_ids) - len(pages)))
+
+        edits = []
+        timestamp = datetime.now(timezone.utc)
+        for index, (fields, message_id) in enumerate(zip(pages, message_ids)):
+            fingerprint = render_fingerprint(
+                board.channel_id, message_id, board.title, board.author_name, board.author_url,
+                board.author_icon_url, index, len(pages), *(part for field in fields for part in field)
+            )
+            if fingerprint == state.fingerprints.get(index):
+                continue
 
-        embed = discord.Embed(
-            color=0x808080,
-            title='👥 Staff Status Overview'
-        )
-        embed.set_author(
-            name="👑 Shivam's Discord",
-            icon_url="https://cdn.discordapp.com/icons/1349281907765936188/7f90f5ba832e7672d4f55eb0c6017813.png",
-            url="https://discord.gg/ha7K8ngyex"
-        )
-        embed.add_field(
-            name='Available Staff:',
-            value='\n'.join(available) or "*No staff available.*",
-            inline=False
-        )
-        embed.add_field(
-            name='Unavailable Staff:',
-            value='\n'.join(unavailable) or "*No staff unavailable.*",
-            inline=False
-        )
-        embed.set_footer(text='Status last updated')
-        embed.timestamp = datetime.now(timezone.utc)
+            embed = discord.Embed(
+                color=0x808080,
+                title=board.title if len(pages) == 1 else f'{board.title} ({index + 1}/{len(pages)})'
+            )
+            if board.author_name and index == 0:
+                embed.set_author(
+                    name=board.author_name,
+                    icon_url=board.author_icon_url,
+                    url=board.author_url
+                )
+            for name, value in fields:
+                embed.add_field(name=name, value=value, inline=False)
+            embed.set_footer(text='Status last updated')
+            embed.timestamp = timestamp
+
+            msg = channel.get_partial_message(message_id)
+            state.fingerprints[index] = fingerprint
+            edit = rest_queue.submit(PRIORITY_BOARD, lambda msg=msg, embed=embed: msg.edit(embed=embed),
+                                     key=('edit', channel.id, message_id))
+            edits.append(confirm_board_edit(board, state, index, message_id, fingerprint, edit))
+
+        for index in [index for index in state.fingerprints if index >= len(pages)]:
+            del state.fingerprints[index]
+        for index in [index for index in state.confirmed if index >= len(pages)]:
+            del state.confirmed[index]
+        return edits
 
-        msg = await channel.fetch_message(int(status_message_id))
-        await msg.edit(embed=embed)
-        print(f'✓ Updated status message')
+    except Exception as err:
+        state.fingerprints.clear()
+        status_log.exception('Status update failed for board "%s" in guild %s: %s', board.name, board.guild_id, err)
+        return []
 
+async def confirm_board_edit(board: StatusBoard, state: BoardState, page: int, message_id: int, fingerprint: str,
+                             edit: asyncio.Future):
+    try:
+        await edit
+        state.confirmed[page] = fingerprint
+        status_log.debug('Updated page %d of status board "%s" for guild %s', page + 1, board.name, board.guild_id)
     except Exception as err:
-        print(f'❌ Status update failed: {err}')
-        import traceback
-        traceback.print_exc()
+        if isinstance(err, discord.NotFound) and message_id in board.page_message_ids:
+            # A deleted page message is posted again on the next render; later pages move up one
+            board.page_message_ids.remove(message_id)
+            db.update_board(board)
+            state.fingerprints.clear()
+            state.confirmed.clear()
+        # Only forget the fingerprint if no newer render has replaced it
+        elif state.fingerprints.get(page) == fingerprint:
+            del state.fingerprints[page]
+        status_log.error('Status update failed for board "%s" in guild %s: %s', board.name, board.guild_id, err)
+
+# --- STAFF AVAILABILITY ---
+
+PRESENCE_STATUSES = ('offline', 'online', 'idle', 'dnd')
+
+class PresenceTracker:
+    """Logs staff presence transitions and rolls time spent per status up into hourly and daily buckets.
+
+    Only each member's current status and when it began are held in memory.
+    The elapsed time is split across hour buckets when the status changes or
+    at a checkpoint, and flush() writes the buffered events and bucket
+    increments in one transaction, so reports never read the raw log.
+    """
+
+    def __init__(self, database: Database):
+        self.db = database
+        self._current: Dict[Tuple[int, int], Tuple[int, int]] = {}  # (guild, user) -> (status, since)
+        self._events: List[Tuple[int, int, int, int]] = []
+        self._hourly: Dict[Tuple[int, int, int], List[int]] = {}
+        self._last_prune_day = None
+
+    def _attribute(self, guild_id: int, user_id: int, status: int, start: int, end: int):
+        if not status:
+            return  # Offline time is whatever is left of the hour
+        while start < end:
+            hour = start // 3600
+            boundary = min(end, (hour + 1) * 3600)
+            bucket = self._hourly.setdefault((guild_id, hour, user_id), [0, 0, 0])
+            bucket[status - 1] += boundary - start
+            start = boundary
+
+    def observe(self, guild_id: int, user_id: int, status: str, at: Optional[int] = None):
+        """Records a staff member's status; repeats of the current status are ignored"""
+        code = PRESENCE_STATUSES.index(status) if status in PRESENCE_STATUSES else 0
+        at = int(time.time()) if at is None else at
+        current = self._current.get((guild_id, user_id))
+        if current and current[0] == code:
+            return
+        if current:
+            self._attribute(guild_id, user_id, current[0], current[1], at)
+        self._current[(guild_id, user_id)] = (code, at)
+        self._events.append((guild_id, user_id, at, code))
+
+    def checkpoint(self, at: Optional[int] = None):
+        """Attributes time up to now for every open status, dropping members that are no longer staff"""
+        at = int(time.time()) if at is None else at
+        for (guild_id, user_id), (code, since) in list(self._current.items()):
+            self._attribute(guild_id, user_id, code, since, at)
+            if self.db.is_staff_member(guild_id, user_id):
+                self._current[(guild_id, user_id)] = (code, at)
+            else:
+                del self._current[(guild_id, user_id)]
+
+    async def flush(self):
+        self.checkpoint()
+
+        now = int(time.time())
+        if now // 86400 != self._last_prune_day:
+            self._last_prune_day = now // 86400
+            self.db.prune_presence(now - PRESENCE_EVENT_RETENTION_DAYS * 86400,
+                                   now // 3600 - PRESENCE_HOURLY_RETENTION_DAYS * 24)
+
+        if self._events or self._hourly:
+            events, self._events = self._events, []
+            hourly, self._hourly = self._hourly, {}
+            self.db.add_presence(events, hourly)
+        await self.db.flush()
+
+presence_tracker = PresenceTracker(db)
 
 # --- MESSAGE COUNTING ---
 
-async def get_weekly_message_counts(source_channel: discord.TextChannel) -> Dict[str, int]:
-    message_counts = {}
-    cutoff_time = datetime.now(timezone.utc) - timedelta(days=7)
+def hour_of(moment: datetime) -> int:
+    """Returns the UTC hour bucket (hours since the Unix epoch) for a datetime"""
+    return int(moment.timestamp()) // 3600
+
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+class CountWindow:
+    """A range of hour buckets [start_hour, end_hour), optionally limited to some weekdays (0 = Monday)"""
+
+    PRESETS = {'24h': (24, 'Last 24 hours'), '7d': (7 * 24, 'Last 7 days'), '30d': (30 * 24, 'Last 30 days')}
+    PERIODS = {'24h': ('daily', 'day'), '7d': ('weekly', 'week'), '30d': ('monthly', 'month')}
+
+    def __init__(self, start_hour: int, end_hour: int, label: str, weekdays: Optional[Set[int]] = None):
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.label = label
+        self.weekdays = frozenset(weekdays) if weekdays else None
+
+    @classmethod
+    def preset(cls, name: str = DEFAULT_COUNT_WINDOW, weekdays: Optional[Set[int]] = None) -> 'CountWindow':
+        """One of PRESETS, ending with the current hour"""
+        hours, label = cls.PRESETS[name]
+        end_hour = hour_of(datetime.now(timezone.utc)) + 1
+        return cls(end_hour - hours, end_hour, label, weekdays)
+
+    @classmethod
+    def between(cls, first_day: date, last_day: date, weekdays: Optional[Set[int]] = None) -> 'CountWindow':
+        """Whole UTC days from first_day to last_day, inclusive"""
+        if last_day < first_day:
+            raise ValueError('The end date is before the start date')
+        start = datetime(first_day.year, first_day.month, first_day.day, tzinfo=timezone.utc)
+        end = datetime(last_day.year, last_day.month, last_day.day, tzinfo=timezone.utc) + timedelta(days=1)
+        return cls(hour_of(start), hour_of(end), 'Custom range', weekdays)
+
+    @property
+    def key(self) -> tuple:
+        return self.start_hour, self.end_hour, self.weekdays
+
+    @property
+    def start(self) -> datetime:
+        return datetime.fromtimestamp(self.start_hour * 3600, timezone.utc)
+
+    @property
+    def end(self) -> datetime:
+        return datetime.fromtimestamp(self.end_hour * 3600, timezone.utc)
+
+    def describe(self) -> str:
+        if not self.weekdays:
+            return self.label
+        return f'{self.label}, {", ".join(WEEKDAY_NAMES[day] for day in sorted(self.weekdays))} only'
+
+class ChannelCounts:
+    """One channel's hourly counts as parallel (hour, user index, count) column arrays.
+
+    Rows are appended as counts are flushed and kept sorted by hour, so a
+    window is a contiguous slice found by binary search. Several rows may
+    share an hour and user; they are summed, and merged by compact().
+    """
+
+    def __init__(self):
+        self.hours = array('i')
+        self.users = array('i')
+        self.counts = array('i')
+        self._sorted = True
+        self._compacted_rows = 0
+
+    def __len__(self) -> int:
+        return len(self.hours)
+
+    def add(self, hour: int, user: int, count: int):
+        if self.hours and hour < self.hours[-1]:
+            self._sorted = False
+        self.hours.append(hour)
+        self.users.append(user)
+        self.counts.append(count)
+
+    def _set_rows(self, order: List[int]):
+        self.hours = array('i', (self.hours[index] for index in order))
+        self.users = array('i', (self.users[index] for index in order))
+        self.counts = array('i', (self.counts[index] for index in order))
+
+    def _ensure_sorted(self):
+        if self._sorted:
+            return
+        if numpy is not None:
+            order = numpy.argsort(numpy.frombuffer(self.hours, dtype=numpy.int32), kind='stable').tolist()
+        else:
+            order = sorted(range(len(self.hours)), key=self.hours.__getitem__)
+        self._set_rows(order)
+        self._sorted = True
+
+    def compact(self, before_hour: Optional[int] = None):
+        """Merges rows sharing an hour and user, dropping rows older than before_hour"""
+        merged: Dict[Tuple[int, int], int] = {}
+        for hour, user, count in zip(self.hours, self.users, self.counts):
+            if before_hour is None or hour >= before_hour:
+                merged[(hour, user)] = merged.get((hour, user), 0) + count
+
+        rows = sorted((key, count) for key, count in merged.items() if count)
+        self.hours = array('i', (hour for (hour, _), _ in rows))
+        self.users = array('i', (user for (_, user), _ in rows))
+        self.counts = array('i', (count for _, count in rows))
+        self._sorted = True
+        self._compacted_rows = len(rows)
+
+    def totals(self, window: CountWindow) -> Dict[int, int]:
+        """Sums each user index's messages inside the window"""
+        if len(self) > 2 * self._compacted_rows + 10000:
+            self.compact()
+        self._ensure_sorted()
+
+        low = bisect_left(self.hours, window.start_hour)
+        high = bisect_left(self.hours, window.end_hour)
+        if numpy is not None:
+            hours = numpy.frombuffer(self.hours, dtype=numpy.int32)[low:high]
+            users = numpy.frombuffer(self.users, dtype=numpy.int32)[low:high]
+            counts = numpy.frombuffer(self.counts, dtype=numpy.int32)[low:high]
+            if window.weekdays is not None:
+                # Day 0 of the epoch was a Thursday
+                mask = numpy.isin((hours // 24 + 3) % 7, list(window.weekdays))
+                users, counts = users[mask], counts[mask]
+            sums = numpy.bincount(users, weights=counts)
+            return {int(user): int(sums[user]) for user in numpy.flatnonzero(sums > 0)}
+
+        sums: Dict[int, int] = {}
+        for index in range(low, high):
+            if window.weekdays is None or (self.hours[index] // 24 + 3) % 7 in window.weekdays:
+                user = self.users[index]
+                sums[user] = sums.get(user, 0) + self.counts[index]
+        return {user: total for user, total in sums.items() if total > 0}
+
+class FenwickTree:
+    """Binary indexed tree over positions 1..size with O(log n) point updates, prefix sums and searches"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index: int, delta: int):
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Sum of positions 1..index"""
+        total = 0
+        index = min(index, self.size)
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def search(self, target: int) -> int:
+        """Smallest position whose prefix sum reaches target"""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            if position + step <= self.size and self.tree[position + step] < target:
+                position += step
+                target -= self.tree[position]
+            step >>= 1
+        return position + 1
+
+class RankingIndex:
+    """Live per-user totals over a rolling window of hours, ranked without sorting.
+
+    A Fenwick tree counts how many users have each message total, so a
+    user's rank (1 + users with a higher total) and the k-th highest total
+    are O(log n) lookups; users sharing a total are kept in by_count. Hourly
+    contributions are remembered so they can be subtracted again when their
+    hour leaves the window.
+    """
+
+    def __init__(self, window_hours: int, now_hour: int):
+        self.window_hours = window_hours
+        self.start_hour = now_hour - window_hours + 1
+        self.hours: Dict[int, Dict[int, int]] = {}
+        self.totals: Dict[int, int] = {}
+        self.by_count: Dict[int, Set[int]] = {}
+        self.total_messages = 0
+        self.tree = FenwickTree(64)
+
+    def _set_total(self, user_id: int, total: int):
+        old = self.totals.get(user_id, 0)
+        if old > 0:
+            self.tree.add(old, -1)
+            self.by_count[old].discard(user_id)
+            if not self.by_count[old]:
+                del self.by_count[old]
+        if total > 0:
+            if total > self.tree.size:
+                self._grow(total)
+            self.tree.add(total, 1)
+            self.by_count.setdefault(total, set()).add(user_id)
+            self.totals[user_id] = total
+        else:
+            self.totals.pop(user_id, None)
+
+    def _grow(self, minimum: int):
+        size = self.tree.size
+        while size < minimum:
+            size *= 2
+        self.tree = FenwickTree(size)
+        for total, users in self.by_count.items():
+            self.tree.add(total, len(users))
+
+    def add(self, hour: int, user_id: int, count: int):
+        if hour < self.start_hour:
+            return  # Already outside the window
+        bucket = self.hours.setdefault(hour, {})
+        bucket[user_id] = bucket.get(user_id, 0) + count
+        self.total_messages += count
+        self._set_total(user_id, self.totals.get(user_id, 0) + count)
+
+    def advance(self, now_hour: int):
+        """Expires the hours that have left the window"""
+        start_hour = now_hour - self.window_hours + 1
+        if start_hour <= self.start_hour:
+            return
+        for hour in [hour for hour in self.hours if hour < start_hour]:
+            for user_id, count in self.hours.pop(hour).items():
+                self.total_messages -= count
+                self._set_total(user_id, self.totals.get(user_id, 0) - count)
+        self.start_hour = start_hour
+
+    @property
+    def ranked_users(self) -> int:
+        return len(self.totals)
+
+    def rank(self, user_id: int) -> Optional[Tuple[int, int]]:
+        """Returns (rank, total) for a user with messages in the window"""
+        total = self.totals.get(user_id)
+        if not total:
+            return None
+        return self.ranked_users - self.tree.prefix(total) + 1, total
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """The highest (user_id, total) pairs, best first; ties are ordered by user ID"""
+        result = []
+        seen = 0
+        while len(result) < limit and seen < self.ranked_users:
+            # The (seen + 1)-th highest total is the (ranked_users - seen)-th lowest
+            total = self.tree.search(self.ranked_users - seen)
+            users = sorted(self.by_count[total])
+            result.extend((user_id, total) for user_id in users[:limit - len(result)])
+            seen += len(users)
+        return result
+
+class MessageStore:
+    """In-memory, per-channel hourly message counts that answer any window without touching SQLite.
+
+    A channel is loaded from message_counts the first time it is queried and
+    then kept current by add(), which is fed every batch of counts written to
+    the database. Counts arriving while a channel is loading are held back and
+    applied after the rows, so none are lost or counted twice.
+    """
+
+    def __init__(self, database: Database):
+        self.db = database
+        self._channels: Dict[int, ChannelCounts] = {}
+        self._loading: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._load_locks: Dict[int, asyncio.Lock] = {}
+        self._user_index: Dict[int, int] = {}
+        self._user_ids = array('q')
+        self._rankings: Dict[Tuple[frozenset, str], RankingIndex] = {}
+
+    def _user(self, user_id: int) -> int:
+        index = self._user_index.get(user_id)
+        if index is None:
+            index = self._user_index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+        return index
+
+    def add(self, counts: Dict[Tuple[int, int, int], int]):
+        """Applies (channel_id, hour, user_id) counts that were just written to the database"""
+        for (channel_id, hour, user_id), count in counts.items():
+            if channel_id in self._loading:
+                self._loading[channel_id].append((hour, user_id, count))
+            elif channel_id in self._channels:
+                self._channels[channel_id].add(hour, self._user(user_id), count)
+                for (ranked_channel_ids, _), ranking in self._rankings.items():
+                    if channel_id in ranked_channel_ids:
+                        ranking.add(hour, user_id, count)
+
+    async def _channel(self, channel_id: int) -> ChannelCounts:
+        lock = self._load_locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            if channel_id in self._channels:
+                return self._channels[channel_id]
+
+            self._loading[channel_id] = []
+            try:
+                since_hour = hour_of(datetime.now(timezone.utc) - timedelta(days=MESSAGE_RETENTION_DAYS))
+                rows = await self.db.get_message_count_rows(channel_id, since_hour)
+            except BaseException:
+                del self._loading[channel_id]
+                raise
+
+            channel = ChannelCounts()
+            for hour, user_id, count in rows + self._loading.pop(channel_id):
+                channel.add(hour, self._user(user_id), count)
+            channel.compact()
+            self._channels[channel_id] = channel
+            counts_log.debug('Loaded %d hourly buckets for channel %s', len(channel), channel_id)
+            return channel
+
+    async def query(self, channel_ids: List[int], window: CountWindow) -> Dict[int, int]:
+        """Returns {user_id: messages} summed over the channels within the window"""
+        totals: Dict[int, int] = {}
+        for channel_id in channel_ids:
+            channel = await self._channel(channel_id)
+            for user, total in channel.totals(window).items():
+                user_id = self._user_ids[user]
+                totals[user_id] = totals.get(user_id, 0) + total
+        return totals
+
+    async def ranking(self, channel_ids: List[int], window_name: str) -> RankingIndex:
+        """The live ranking over a set of channels and one of the CountWindow presets, built on first use"""
+        channels = [await self._channel(channel_id) for channel_id in channel_ids]
+        now_hour = hour_of(datetime.now(timezone.utc))
+
+        key = (frozenset(channel_ids), window_name)
+        ranking = self._rankings.get(key)
+        if ranking is None:
+            ranking = RankingIndex(CountWindow.PRESETS[window_name][0], now_hour)
+            for channel in channels:
+                channel.compact()
+                low = bisect_left(channel.hours, ranking.start_hour)
+                for index in range(low, len(channel)):
+                    ranking.add(channel.hours[index], self._user_ids[channel.users[index]], channel.counts[index])
+            self._rankings[key] = ranking
+
+        ranking.advance(now_hour)
+        return ranking
+
+    def prune(self, before_hour: int):
+        for channel in self._channels.values():
+            channel.compact(before_hour)
+
+    def snapshot(self) -> Tuple[bytes, Dict[int, Tuple[bytes, bytes, bytes]]]:
+        """The loaded channels' columns as raw bytes, with the user IDs their indices refer to"""
+        channels = {}
+        for channel_id, channel in self._channels.items():
+            channel.compact()
+            channels[channel_id] = (channel.hours.tobytes(), channel.users.tobytes(), channel.counts.tobytes())
+        return self._user_ids.tobytes(), channels
+
+    def restore(self, user_ids: bytes, channels: Dict[int, Tuple[bytes, bytes, bytes]], before_hour: int) -> int:
+        """Installs snapshotted channels that are not loaded yet; returns how many were restored"""
+        snapshot_user_ids = array('q')
+        snapshot_user_ids.frombytes(user_ids)
+        # Snapshot user indices map onto this store's (usually identical, when restored first)
+        remap = array('i', (self._user(user_id) for user_id in snapshot_user_ids))
+        identical = all(index == position for position, index in enumerate(remap))
+
+        restored = 0
+        for channel_id, (hours, users, counts) in channels.items():
+            if channel_id in self._channels or channel_id in self._loading:
+                continue
+            channel = ChannelCounts()
+            channel.hours.frombytes(hours)
+            channel.users.frombytes(users)
+            channel.counts.frombytes(counts)
+            if not identical:
+                channel.users = array('i', (remap[user] for user in channel.users))
+            channel.compact(before_hour)
+            self._channels[channel_id] = channel
+            restored += 1
+        return restored
+
+message_store = MessageStore(db)
+
+class HistoryScanner:
+    """Backfills message counts from channel history.
+
+    The requested range is turned into snowflake bounds and split into
+    HISTORY_SLICE_SECONDS slices that are fetched concurrently (at most
+    HISTORY_SCAN_CONCURRENCY at once) with after=/before= cursors. Every page
+    is committed together with its slice's cursor, so an interrupted scan
+    resumes where it stopped instead of starting over.
+    """
+
+    def __init__(self, database: Database):
+        self.db = database
+        self.semaphore = asyncio.Semaphore(HISTORY_SCAN_CONCURRENCY)
+
+    @staticmethod
+    def split(after: int, before: int) -> List[Tuple[int, int]]:
+        """Splits a snowflake range into time slices"""
+        slice_span = HISTORY_SLICE_SECONDS * 1000 << 22
+        slices = []
+        start = after
+        while start < before - 1:
+            end = min(start + slice_span, before)
+            slices.append((start, end))
+            # Bounds are exclusive, so the next slice starts just below this one's end
+            start = end - 1
+        return slices
+
+    async def scan(self, channel: discord.TextChannel, after: int, before: int) -> int:
+        """Counts every non-bot message with after < id <= before; returns messages counted"""
+        before += 1
+        slices = await self.db.get_scan_slices(channel.id)
+        covered_to = max((end - 1 for _, end, _ in slices), default=after)
+        new_slices = self.split(max(after, covered_to), before)
+        if new_slices:
+            self.db.add_scan_slices(channel.id, new_slices)
+            slices.extend((start, end, start) for start, end in new_slices)
+
+        pending = [(start, end, cursor) for start, end, cursor in slices if cursor < end - 1]
+        counts_log.info('Scanning %s: %d of %d slices left', channel.name, len(pending), len(slices))
+
+        # Let every slice settle before reporting a failure so none keeps running behind a retry
+        results = await asyncio.gather(*(
+            self._scan_slice(channel, start, end, cursor) for start, end, cursor in pending
+        ), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return sum(results)
+
+    async def _scan_slice(self, channel: discord.TextChannel, slice_start: int, slice_end: int, cursor: int) -> int:
+        async with self.semaphore:
+            counted = 0
+            fetched = 0
+            counts: Dict[Tuple[int, int, int], int] = {}
+            async for message in channel.history(
+                limit=None, after=discord.Object(id=cursor), before=discord.Object(id=slice_end), oldest_first=True
+            ):
+                fetched += 1
+                cursor = message.id
+                if not message.author.bot:
+                    key = (channel.id, hour_of(message.created_at), message.author.id)
+                    counts[key] = counts.get(key, 0) + 1
+                    counted += 1
+
+                if fetched % HISTORY_PAGE_SIZE == 0:
+                    metrics.history_pages.inc()
+                    self.db.checkpoint_scan_slice(channel.id, slice_start, cursor, counts)
+                    message_store.add(counts)
+                    counts = {}
+
+            if fetched % HISTORY_PAGE_SIZE:
+                metrics.history_pages.inc()
+            metrics.history_messages.inc(amount=fetched)
+            # Mark the slice finished
+            self.db.checkpoint_scan_slice(channel.id, slice_start, slice_end - 1, counts)
+            message_store.add(counts)
+            return counted
+
+history_scanner = HistoryScanner(db)
+
+class MessageCounter:
+    """Per-user, per-hour message counters fed live from on_message.
+
+    Counts are buffered in memory and flushed in batches. Each channel keeps a
+    cursor (the newest message already counted); after a restart or a
+    non-resumed reconnect the gap between that cursor and the moment live
+    ingestion took over is backfilled from history once. While a channel has
+    an open gap its buffered counts are held back, so the stored cursor never
+    runs ahead of what is actually in the database.
+    """
+
+    def __init__(self, database: Database):
+        self.db = database
+        self.channel_ids: Set[int] = set()
+        self._pending: Dict[Tuple[int, int, int], int] = {}
+        self._accounted: Dict[int, int] = {}  # channel -> newest counted message id
+        self._gaps: Dict[int, Tuple[Optional[int], int]] = {}  # channel -> (after, before)
+        self._sync_locks: Dict[int, asyncio.Lock] = {}
+        self.sync_tasks: Set[asyncio.Task] = set()  # Background backfills, held until they finish
+        self._last_prune_day = 0  # Pruning runs once per UTC day
+
+    async def track(self, channel_id: int):
+        """Starts counting a channel, opening a gap up to now for the backfill"""
+        if channel_id in self.channel_ids:
+            return
+        self.channel_ids.add(channel_id)
+
+        if channel_id not in self._accounted:
+            cursor = await self.db.get_ingest_cursor(channel_id)
+            if cursor:
+                self._accounted[channel_id] = cursor
+        self._open_gap(channel_id, discord.utils.time_snowflake(datetime.now(timezone.utc)))
+
+    def start_session(self, channel_ids: Iterable[int]):
+        """Called on a shard's (re)connect: anything sent to its channels while disconnected must be backfilled"""
+        floor = discord.utils.time_snowflake(datetime.now(timezone.utc))
+        for channel_id in self.channel_ids.intersection(channel_ids):
+            self._open_gap(channel_id, floor)
+
+    def _open_gap(self, channel_id: int, before: int):
+        after, _ = self._gaps.get(channel_id, (self._accounted.get(channel_id), before))
+        self._gaps[channel_id] = (after, before)
+
+    def _increment(self, channel_id: int, moment: datetime, user_id: int, amount: int):
+        key = (channel_id, hour_of(moment), user_id)
+        self._pending[key] = self._pending.get(key, 0) + amount
+
+    def record(self, message: discord.Message):
+        channel_id = message.channel.id
+        if channel_id not in self.channel_ids or message.author.bot:
+            return
 
-    fetched_messages = 0
-    last_id = None
+        gap = self._gaps.get(channel_id)
+        if gap and message.id <= gap[1]:
+            return  # The backfill will pick this one up
 
-    print(f'[MESSAGE COUNT] Starting to count messages from {source_channel.name}')
-    print(f'[MESSAGE COUNT] Cutoff time: {cutoff_time.strftime("%Y-%m-%d %H:%M:%S UTC")}')
+        self._increment(channel_id, message.created_at, message.author.id, 1)
+        self._accounted[channel_id] = max(self._accounted.get(channel_id, 0), message.id)
 
-    while fetched_messages < 5000:
-        messages = []
-        async for message in source_channel.history(limit=100, before=discord.Object(id=last_id) if last_id else None):
-            messages.append(message)
+    def forget(self, message: discord.Message):
+        """Reverses a counted message that was deleted"""
+        channel_id = message.channel.id
+        if channel_id not in self.channel_ids or message.author.bot:
+            return
 
-        if len(messages) == 0:
-            print(f'[MESSAGE COUNT] No more messages to fetch')
-            break
+        gap = self._gaps.get(channel_id)
+        if message.id > self._accounted.get(channel_id, 0):
+            return  # Never counted
+        if gap and (gap[0] or 0) < message.id <= gap[1]:
+            return  # The backfill will not see it either
+
+        self._increment(channel_id, message.created_at, message.author.id, -1)
+
+    async def sync(self, channel: discord.TextChannel):
+        """Backfills the channel's open gap from history, if it has one"""
+        lock = self._sync_locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            while channel.id in self._gaps:
+                after, before = self._gaps[channel.id]
+                window_start = discord.utils.time_snowflake(
+                    datetime.now(timezone.utc) - timedelta(days=HISTORY_BACKFILL_DAYS)
+                )
+                after = max(after or 0, window_start)
+
+                counts_log.info('Backfilling %s from history', channel.name)
+                counted = await history_scanner.scan(channel, after, before)
+                counts_log.info('Backfilled %d messages from %s', counted, channel.name)
+
+                if self._gaps[channel.id][1] == before:
+                    del self._gaps[channel.id]
+                    self._accounted[channel.id] = max(self._accounted.get(channel.id, 0), before)
+                    self.db.complete_scan(channel.id, before)
+                else:
+                    # A reconnect during the scan pushed the gap further out
+                    self._gaps[channel.id] = (before, self._gaps[channel.id][1])
+
+        await self.flush()
+
+    async def flush(self):
+        """Writes buffered counts for every gap-free channel in one commit"""
+        counts = {}
+        for key in list(self._pending):
+            if key[0] not in self._gaps:
+                counts[key] = self._pending.pop(key)
+
+        cursors = {
+            channel_id: message_id
+            for channel_id, message_id in self._accounted.items()
+            if channel_id not in self._gaps
+        }
+
+        now_hour = hour_of(datetime.now(timezone.utc))
+        if now_hour // 24 != self._last_prune_day:
+            self._last_prune_day = now_hour // 24
+            before_hour = now_hour - MESSAGE_RETENTION_DAYS * 24
+            self.db.prune_message_counts(before_hour)
+            message_store.prune(before_hour)
+
+        if counts or cursors:
+            self.db.add_message_counts(counts, cursors)
+            message_store.add(counts)
+        await self.db.flush()
+
+    async def _prepare(self, channels: List[discord.TextChannel]):
+        """Tracks the channels and backfills their gaps concurrently, then flushes live counts.
+
+        Backfills of all channels share the history scanner's slice pool, so
+        at most HISTORY_SCAN_CONCURRENCY pages are fetched at once overall.
+        """
+        for channel in channels:
+            await self.track(channel.id)
+
+        results = await asyncio.gather(*(self.sync(channel) for channel in channels), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        await self.flush()
+
+    async def get_counts(self, channels: List[discord.TextChannel], window: CountWindow) -> Dict[int, int]:
+        await self._prepare(channels)
+        return await message_store.query([channel.id for channel in channels], window)
+
+    async def get_ranking(self, channels: List[discord.TextChannel], window_name: str) -> RankingIndex:
+        """The live ranking over the channels, including every message received so far"""
+        await self._prepare(channels)
+        return await message_store.ranking([channel.id for channel in channels], window_name)
+
+message_counter = MessageCounter(db)
+
+class CountsCache:
+    """TTL cache with single-flight coalescing.
+
+    Concurrent callers asking for the same key await one shared computation;
+    its result is then served from memory until the TTL expires.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._in_flight: Dict[Any, asyncio.Future] = {}
+
+    async def get(self, key, compute):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            metrics.counts_cache.inc('hit')
+            return entry[1]
+        metrics.counts_cache.inc('miss')
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._store(key, done))
+
+        # Shielded so one caller giving up does not cancel everyone else's result
+        return await asyncio.shield(future)
+
+    def _store(self, key, future: asyncio.Future):
+        self._in_flight.pop(key, None)
+        now = time.monotonic()
+        # Keys include the channel set and window, so stale ones would otherwise pile up forever
+        for expired_key in [cached_key for cached_key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[expired_key]
+        if not future.cancelled() and future.exception() is None:
+            self._entries[key] = (now + self.ttl, future.result())
+
+counts_cache = CountsCache(COUNTS_CACHE_TTL)
+
+async def sync_message_counts(channel: discord.TextChannel):
+    """Background backfill of a counted channel's offline gap"""
+    try:
+        await message_counter.sync(channel)
+    except Exception as error:
+        counts_log.error('Backfill of %s failed: %s', channel.name, error)
+
+def start_message_sync(channel: discord.TextChannel):
+    """Starts a background backfill; the loop only keeps a weak reference, so the counter holds the task"""
+    task = asyncio.create_task(sync_message_counts(channel))
+    message_counter.sync_tasks.add(task)
+    task.add_done_callback(message_counter.sync_tasks.discard)
+
+def source_channel_ids(guild_id: int) -> List[int]:
+    """Channels picked individually for counting; older setups stored a single sourceChannelId"""
+    channel_ids = db.get(guild_id, 'sourceChannelIds')
+    if channel_ids is None:
+        legacy_channel_id = db.get(guild_id, 'sourceChannelId')
+        channel_ids = [legacy_channel_id] if legacy_channel_id else []
+    return [int(channel_id) for channel_id in channel_ids]
+
+def source_channels(guild: discord.Guild) -> List[discord.TextChannel]:
+    """Every channel counted for a guild: the picked channels plus the text channels of the source category"""
+    channels = {}
+    for channel_id in source_channel_ids(guild.id):
+        channel = guild.get_channel(channel_id)
+        if channel is not None:
+            channels[channel.id] = channel
+
+    category_id = db.get(guild.id, 'sourceCategoryId')
+    category = guild.get_channel(int(category_id)) if category_id else None
+    if isinstance(category, discord.CategoryChannel):
+        for channel in category.text_channels:
+            channels[channel.id] = channel
+    return list(channels.values())
+
+def describe_sources(channels: List[discord.TextChannel], limit: int = 5) -> str:
+    mentions = ', '.join(f'<#{channel.id}>' for channel in channels[:limit])
+    if len(channels) > limit:
+        mentions += f' and {len(channels) - limit} more'
+    return mentions
+
+async def get_message_counts(channels: List[discord.TextChannel], window: CountWindow) -> Dict[int, int]:
+    counts_log.debug('Counting messages from %d channels (%s)', len(channels), window.describe())
+    message_counts = await counts_cache.get(
+        (tuple(sorted(channel.id for channel in channels)), window.key),
+        lambda: message_counter.get_counts(channels, window)
+    )
 
-        for message in messages:
-            if message.created_at < cutoff_time:
-                fetched_messages = 5001
-                print(f'[MESSAGE COUNT] Reached cutoff time')
-                break
+    counts_log.debug('Counted %d messages from %d users', sum(message_counts.values()), len(message_counts))
+    return message_counts
 
-            if not message.author.bot:
-                user_id = str(message.author.id)
-                message_counts[user_id] = message_counts.get(user_id, 0) + 1
+# --- LEADERBOARD LOGIC ---
 
-        if fetched_messages > 5000:
-            break
+def placement_streaks(positions: List[Optional[int]], top_count: int) -> Tuple[int, int, int]:
+    """Returns (current, longest, total) finishes within the top places; positions are newest first"""
+    placed = [position is not None and position <= top_count for position in positions]
+    current = next((index for index, in_top in enumerate(placed) if not in_top), len(placed))
+    longest = run = 0
+    for in_top in placed:
+        run = run + 1 if in_top else 0
+        longest = max(longest, run)
+    return current, longest, sum(placed)
+
+async def reconcile_role_holders(guild: discord.Guild, role: discord.Role, target_ids: Set[int]) -> Tuple[int, int]:
+    """Makes target_ids the exact holders of role, touching only members whose membership changes.
+
+    Current holders come from the member cache (role.members) rather than a
+    guild-wide member crawl, plus the holders recorded by the previous sweep,
+    which may not be cached in lean gateway mode. Before any sweep has been
+    recorded, lean mode crawls the member list once instead, since the cache
+    starts out empty. Returns (removed, granted) counts.
+    """
+    current_holders = {member.id: member for member in role.members}
+    recorded = db.get(guild.id, 'topRoleHolderIds')
+    if recorded is None and LEAN_GATEWAY:
+        roles_log.info('No recorded role holders for guild %s, crawling the member list once', guild.id)
+        async for member in guild.fetch_members(limit=None):
+            if member.get_role(role.id):
+                current_holders[member.id] = member
+    recorded_ids = [int(user_id) for user_id in recorded or [] if int(user_id) not in current_holders]
+    for start in range(0, len(recorded_ids), MEMBER_QUERY_BATCH):
+        batch = recorded_ids[start:start + MEMBER_QUERY_BATCH]
+        try:
+            found = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+        except asyncio.TimeoutError:
+            roles_log.warning('Timed out resolving %d recorded role holders', len(batch))
+            continue
+        current_holders.update((member.id, member) for member in found if member.get_role(role.id))
+
+    to_remove = [member for member_id, member in current_holders.items() if member_id not in target_ids]
+    to_add = []
+    for user_id in target_ids - current_holders.keys():
+        member = guild.get_member(user_id)
+        if not member:
+            try:
+                member = await rest_queue.call(PRIORITY_BULK, lambda: guild.fetch_member(user_id))
+            except discord.NotFound:
+                roles_log.info('User %s is no longer a member, skipping', user_id)
+                continue
+        to_add.append(member)
+
+    # Queued as bulk work, so the sweep never holds more than REST_BULK_CONCURRENCY workers
+    async def edit(member: discord.Member, grant: bool) -> bool:
+        try:
+            if grant:
+                await rest_queue.call(PRIORITY_BULK, lambda: member.add_roles(role, reason='Weekly leaderboard top user award.'))
+                roles_log.debug('Granted role to %s', member.name)
+            else:
+                await rest_queue.call(PRIORITY_BULK, lambda: member.remove_roles(role, reason='Weekly leaderboard role clearance.'))
+                roles_log.debug('Removed role from %s', member.name)
+            return True
+        except discord.HTTPException as error:
+            roles_log.warning('Failed to update role for %s: %s', member.name, error)
+            return False
+
+    results = await asyncio.gather(
+        *(edit(member, False) for member in to_remove),
+        *(edit(member, True) for member in to_add)
+    )
+    removed = sum(results[:len(to_remove)])
+    granted = sum(results[len(to_remove):])
 
-        last_id = messages[-1].id
-        fetched_messages += len(messages)
+    # Holders whose removal failed still hold the role and are retried next sweep
+    holders = {member.id for member, succeeded in zip(to_add, results[len(to_remove):]) if succeeded}
+    holders |= target_ids & current_holders.keys()
+    holders |= {member.id for member, succeeded in zip(to_remove, results) if not succeeded}
+    db.set(guild.id, 'topRoleHolderIds', [str(user_id) for user_id in sorted(holders)])
+    return removed, granted
 
-    print(f'[MESSAGE COUNT] Counted {sum(message_counts.values())} messages from {len(message_counts)} users')
-    return message_counts
+async def run_leaderboard_update(bot: DiscordBot, guild_id: int, is_test: bool = False, interaction: discord.Interaction = None,
+                                 window_name: Optional[str] = None):
+    """Posts the leaderboard and reconciles the top role.
 
-# --- LEADERBOARD LOGIC ---
+    Interactive runs report problems to the user; scheduled runs (no
+    interaction) raise instead, so the scheduler counts the failure and retries.
+    """
+    leaderboard_log.info('Starting leaderboard update for guild %s (test=%s)', guild_id, is_test)
 
-async def run_leaderboard_update(bot: DiscordBot, is_test: bool = False, interaction: discord.Interaction = None):
-    print(f'[LEADERBOARD] Starting leaderboard update (test={is_test})')
-    
-    setup_complete = db.get('setupComplete', False)
+    setup_complete = db.get(guild_id, 'setupComplete', False)
 
     if not setup_complete:
         error_msg = 'The auto-leaderboard is not yet set up. Please use `/setup-auto-leaderboard` first.'
-        print(f'[LEADERBOARD] {error_msg}')
-        if interaction:
-            await interaction.response.send_message(error_msg, ephemeral=True)
+        leaderboard_log.warning(error_msg)
+        if not interaction:
+            raise RuntimeError(error_msg)
+        await interaction.response.send_message(error_msg, ephemeral=True)
         return
 
-    # Get guild - prioritize interaction guild, fallback to stored guild
-    guild = None
-    if interaction:
-        guild = interaction.guild
-    else:
-        guild_id = db.get('guildId')
-        if guild_id:
-            guild = bot.get_guild(int(guild_id))
-        if not guild and bot.guilds:
-            guild = bot.guilds[0]
+    guild = interaction.guild if interaction else bot.get_guild(guild_id)
 
     if not guild:
         error_msg = 'Error: Guild not found.'
-        print(f'[LEADERBOARD] {error_msg}')
-        if interaction:
-            await interaction.response.send_message(error_msg, ephemeral=True)
+        leaderboard_log.warning(error_msg)
+        if not interaction:
+            raise RuntimeError(error_msg)
+        await interaction.response.send_message(error_msg, ephemeral=True)
         return
 
     if interaction:
-        await interaction.response.defer()
+        await rest_queue.call(PRIORITY_INTERACTION, interaction.response.defer)
 
     try:
-        leaderboard_channel_id = db.get('leaderboardChannelId')
-        source_channel_id = db.get('sourceChannelId')
-        top_role_to_grant_id = db.get('topRoleToGrantId')
-        top_user_count = db.get('topUserCount', 3)
-
-        print(f'[LEADERBOARD] Config: channel={leaderboard_channel_id}, source={source_channel_id}, role={top_role_to_grant_id}, top={top_user_count}')
+        leaderboard_channel_id = db.get(guild_id, 'leaderboardChannelId')
+        top_role_to_grant_id = db.get(guild_id, 'topRoleToGrantId')
+        top_user_count = db.get(guild_id, 'topUserCount', 3)
 
         leaderboard_channel = guild.get_channel(int(leaderboard_channel_id))
-        source_channel = guild.get_channel(int(source_channel_id))
+        channels = source_channels(guild)
         top_role = guild.get_role(int(top_role_to_grant_id))
 
-        if not leaderboard_channel or not source_channel or not top_role:
+        leaderboard_log.info('Config: channel=%s, sources=%s, role=%s, top=%s',
+                             leaderboard_channel_id, [channel.id for channel in channels], top_role_to_grant_id, top_user_count)
+
+        if not leaderboard_channel or not channels or not top_role:
             error_msg = 'Setup configuration is invalid (Channel/Role not found). Please run `/setup-auto-leaderboard` again.'
-            print(f'[LEADERBOARD] {error_msg}')
-            print(f'[LEADERBOARD] leaderboard_channel={leaderboard_channel}, source_channel={source_channel}, top_role={top_role}')
-            if interaction:
-                await interaction.followup.send(error_msg)
+            leaderboard_log.warning('%s (leaderboard_channel=%s, sources=%d, top_role=%s)',
+                                    error_msg, leaderboard_channel, len(channels), top_role)
+            if not interaction:
+                raise RuntimeError(error_msg)
+            await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(error_msg))
             return
 
-        print('[LEADERBOARD] Fetching message counts...')
-        message_counts = await get_weekly_message_counts(source_channel)
+        leaderboard_log.info('Fetching message counts...')
+        window_name = window_name or db.get(guild_id, 'leaderboardWindow', DEFAULT_COUNT_WINDOW)
+        window = CountWindow.preset(window_name)
+        ranking = await message_counter.get_ranking(channels, window_name)
 
-        if not message_counts:
-            error_msg = 'No messages found in the last 7 days. Cannot generate leaderboard.'
-            print(f'[LEADERBOARD] {error_msg}')
+        if not ranking.ranked_users:
+            error_msg = f'No messages found ({window.describe().lower()}). Cannot generate leaderboard.'
+            leaderboard_log.warning(error_msg)
             if interaction:
-                await interaction.followup.send(error_msg)
+                await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(error_msg))
             return
 
-        sorted_users = sorted(message_counts.items(), key=lambda x: x[1], reverse=True)[:top_user_count]
+        sorted_users = ranking.top(top_user_count)
         top_user_ids = [user_id for user_id, _ in sorted_users]
+        # Snapshot the full standings now; the live ranking keeps moving while roles are edited
+        standings = [(user_id, ranking.rank(user_id)[0], total) for user_id, total in ranking.top(ranking.ranked_users)]
+        total_messages = ranking.total_messages
 
-        print(f'[LEADERBOARD] Top users: {sorted_users}')
+        leaderboard_log.info('Top users: %s', sorted_users)
 
-        print(f'[ROLES] Clearing role "{top_role.name}" from all members...')
-        cleared_count = 0
-        async for member in guild.fetch_members(limit=None):
-            if top_role in member.roles:
-                await member.remove_roles(top_role, reason='Weekly leaderboard role clearance.')
-                cleared_count += 1
-        print(f'[ROLES] Cleared role from {cleared_count} members')
-
-        print(f'[ROLES] Granting role "{top_role.name}" to top {len(top_user_ids)} members...')
-        granted_count = 0
-        for user_id in top_user_ids:
-            member = guild.get_member(int(user_id))
-            if member:
-                await member.add_roles(top_role, reason='Weekly leaderboard top user award.')
-                granted_count += 1
-                print(f'[ROLES] Granted role to {member.name}')
-        print(f'[ROLES] Granted role to {granted_count} members')
+        roles_log.info('Reconciling role "%s" with the top %d members...', top_role.name, len(top_user_ids))
+        cleared_count, granted_count = await reconcile_role_holders(
+            guild, top_role, {int(user_id) for user_id in top_user_ids}
+        )
+        roles_log.info('Cleared role from %d members, granted role to %d members', cleared_count, granted_count)
 
+        period_adjective, period_noun = CountWindow.PERIODS[window_name]
         top1 = f"<@{sorted_users[0][0]}> with **{sorted_users[0][1]}** messages" if len(sorted_users) > 0 else 'N/A (No user ranked)'
         top2 = f"<@{sorted_users[1][0]}> with **{sorted_users[1][1]}** messages" if len(sorted_users) > 1 else 'N/A (No user ranked)'
         top3 = f"<@{sorted_users[2][0]}> with **{sorted_users[2][1]}** messages" if len(sorted_users) > 2 else 'N/A (No user ranked)'
 
         leaderboard_text = f"""Hello fellas, 
-We're back with the weekly leaderboard update!! 
-Here are the top {top_user_count} active members past week:
+We're back with the {period_adjective} leaderboard update!! 
+Here are the top {top_user_count} active members past {period_noun}:
 :first_place: Top 1: {top1}. 
 -# Gets 50k unb in cash.
 :second_place: Top 2: {top2}.
@@ -465,94 +2856,343 @@ All of the top three members have been granted the role:
 
 Top 1 can change their server nickname once. Top 1 & 2 can have a custom role with name and colour based on their requests. Contact <@!1081876265683927080> or <@!1193415556402008169>(<@&1405157360045002785>) within 24 hours to claim your awards."""
 
-        await leaderboard_channel.send(leaderboard_text)
-        print('[LEADERBOARD] Message sent successfully!')
+        await rest_queue.call(PRIORITY_BOARD, lambda: leaderboard_channel.send(leaderboard_text))
+        leaderboard_log.info('Message sent successfully!')
 
         if interaction:
-            await interaction.followup.send(
+            await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
                 f'✅ Leaderboard successfully run and posted to <#{leaderboard_channel_id}>. Roles have been updated.'
-            )
+            ))
 
         if not is_test:
             now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
-            db.set('lastRunTimestamp', now_ms)
-            print('[LEADERBOARD] Updated lastRunTimestamp')
+            db.set(guild_id, 'lastRunTimestamp', now_ms)
+            leaderboard_log.info('Updated lastRunTimestamp')
+            run_id = await db.add_leaderboard_run(guild_id, now_ms, window_name, total_messages, standings)
+            leaderboard_log.info('Recorded run %s with %d ranked members', run_id, len(standings))
 
     except Exception as error:
-        print(f'[LEADERBOARD ERROR] {error}')
-        import traceback
-        traceback.print_exc()
+        if not interaction:
+            raise
+        leaderboard_log.exception('Leaderboard update failed: %s', error)
         error_msg = f'An error occurred while running the leaderboard update: `{error}`'
-        if interaction:
-            await interaction.followup.send(error_msg)
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(error_msg))
+
+# --- SCHEDULER ---
+
+class ScheduledJob:
+    """A recurring job stored in the scheduled_jobs table"""
+
+    def __init__(self, job_id: int, guild_id: int, kind: str, schedule: str,
+                 last_run: Optional[int], next_run: int, enabled: bool = True):
+        self.job_id = job_id
+        self.guild_id = guild_id
+        self.kind = kind
+        self.schedule = schedule
+        self.last_run = last_run
+        self.next_run = next_run
+        self.enabled = bool(enabled)
+
+async def run_scheduled_leaderboard(bot: DiscordBot, guild_id: int):
+    with metrics.leaderboard_update.time():
+        await run_leaderboard_update(bot, guild_id, False, None)
+
+JOB_HANDLERS = {
+    'leaderboard': run_scheduled_leaderboard
+}
+
+class JobScheduler:
+    """Sleeps until the next due job instead of polling on an interval.
+
+    Jobs are loaded from the scheduled_jobs table. A job whose next run passed
+    while the bot was offline is due immediately on start, runs once, and is
+    then rescheduled from the current time, so missed runs never pile up.
+    """
+
+    def __init__(self, bot: DiscordBot, database: Database):
+        self.bot = bot
+        self.db = database
+        self.jobs: Dict[int, ScheduledJob] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task and not self._task.done():
+            return
+
+        self.jobs = {row[0]: ScheduledJob(*row) for row in await self.db.get_jobs()}
+        await self._adopt_legacy_schedules()
+        self._task = asyncio.create_task(self._run())
+        scheduler_log.info('Scheduler started with %d jobs', len(self.jobs))
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            scheduler_log.info('Scheduler stopped.')
+
+    async def _adopt_legacy_schedules(self):
+        """Turns nextRunTimestamp config from before the job table into leaderboard jobs"""
+        for guild_id in self.db.guild_ids():
+            if not self.db.get(guild_id, 'setupComplete', False) or self.get_job(guild_id, 'leaderboard'):
+                continue
+            next_run = self.db.get(guild_id, 'nextRunTimestamp') or calculate_next_run_time()
+            job_id = await self.db.save_job(guild_id, 'leaderboard', DEFAULT_LEADERBOARD_SCHEDULE, next_run)
+            self.jobs[job_id] = ScheduledJob(job_id, guild_id, 'leaderboard', DEFAULT_LEADERBOARD_SCHEDULE, None, next_run)
+
+    def get_job(self, guild_id: int, kind: str) -> Optional[ScheduledJob]:
+        for job in self.jobs.values():
+            if job.guild_id == guild_id and job.kind == kind:
+                return job
+        return None
+
+    def guild_jobs(self, guild_id: int) -> List[ScheduledJob]:
+        return sorted((job for job in self.jobs.values() if job.guild_id == guild_id), key=lambda job: job.next_run)
+
+    async def schedule(self, guild_id: int, kind: str, schedule: str) -> ScheduledJob:
+        """Creates or reschedules a guild's job; schedule must be a valid cron expression"""
+        next_run = calculate_next_run_time(schedule)
+        job_id = await self.db.save_job(guild_id, kind, schedule, next_run)
+
+        job = self.jobs.get(job_id)
+        if job:
+            job.schedule, job.next_run, job.enabled = schedule, next_run, True
+        else:
+            job = self.jobs[job_id] = ScheduledJob(job_id, guild_id, kind, schedule, None, next_run)
+
+        self._wakeup.set()
+        return job
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+
+            now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+            due = [job for job in self.jobs.values() if job.enabled and job.next_run <= now_ms]
+            for job in sorted(due, key=lambda job: job.next_run):
+                await self._execute(job)
+
+            now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+            upcoming = [job.next_run for job in self.jobs.values() if job.enabled]
+            delay = SCHEDULER_MAX_SLEEP
+            if upcoming:
+                delay = min(delay, max(0, (min(upcoming) - now_ms) / 1000))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: ScheduledJob):
+        handler = JOB_HANDLERS.get(job.kind)
+        if not handler:
+            scheduler_log.warning('Unknown job kind "%s" (job %s), disabling', job.kind, job.job_id)
+            job.enabled = False
+            return
+
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        scheduler_log.info('Running %s job for guild %s (scheduled: %s)', job.kind, job.guild_id, job.next_run)
+        try:
+            await handler(self.bot, job.guild_id)
+            metrics.jobs.inc(job.kind, 'success')
+            job.last_run = now_ms
+            job.next_run = calculate_next_run_time(job.schedule)
+            scheduler_log.info('Next run scheduled for: %s',
+                               datetime.fromtimestamp(job.next_run / 1000, timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT'))
+        except Exception as error:
+            scheduler_log.exception('Failed to run %s job for guild %s: %s', job.kind, job.guild_id, error)
+            metrics.jobs.inc(job.kind, 'failure')
+            job.next_run = now_ms + JOB_RETRY_DELAY * 1000
+
+        self.db.update_job_run(job.job_id, job.last_run, job.next_run)
+
+job_scheduler = JobScheduler(client, db)
+
+# --- RUNTIME SNAPSHOTS ---
+
+def save_status_snapshot(bot: DiscordBot):
+    """Saves the last rendered state of every status board so a restart skips unchanged edits.
+
+    Only confirmed fingerprints are saved: an edit still queued at shutdown is
+    cancelled, and restoring its fingerprint would skip it until the content changes.
+    """
+    boards = {
+        str(board_id): {'fingerprints': state.confirmed, 'available_ids': sorted(state.available_ids)}
+        for board_id, state in bot.board_states.items()
+        if state.confirmed
+    }
+    db.save_snapshot('status', json.dumps({'boards': boards}).encode())
+
+def save_runtime_snapshot(bot: DiscordBot):
+    """Saves status boards and the in-memory message counts; call after the last count flush"""
+    save_status_snapshot(bot)
+    user_ids, channels = message_store.snapshot()
+    db.save_count_snapshot(user_ids, channels)
+    log.info('Saved runtime snapshot (%d boards, %d counted channels)', len(bot.board_states), len(channels))
+
+async def load_runtime_snapshot(bot: DiscordBot):
+    """Restores what the last process saved; anything missing or stale is rebuilt as usual"""
+    status = await db.get_snapshot('status')
+    if status:
+        boards = json.loads(status[1])['boards']
+        known_ids = {board.board_id for board in db.boards()}
+        for board_id, saved in boards.items():
+            if int(board_id) not in known_ids:
+                continue
+            state = bot.board_state(int(board_id))
+            # Snapshots from before paginated boards hold a single fingerprint, which no longer matches anyway
+            state.fingerprints = {int(page): fingerprint for page, fingerprint in saved.get('fingerprints', {}).items()}
+            state.confirmed = dict(state.fingerprints)
+            state.available_ids = set(saved['available_ids'])
+        log.info('Restored %d status boards from snapshot', len(boards))
+
+    counts = await db.take_count_snapshot()
+    if counts:
+        before_hour = hour_of(datetime.now(timezone.utc)) - MESSAGE_RETENTION_DAYS * 24
+        restored = message_store.restore(*counts, before_hour)
+        counts_log.info('Restored message counts of %d channels from snapshot', restored)
 
 # --- COMMANDS ---
 
+WINDOW_CHOICES = [app_commands.Choice(name=label, value=name) for name, (_, label) in CountWindow.PRESETS.items()]
+WEEKDAY_CHOICES = [app_commands.Choice(name=name, value=day) for day, name in enumerate(WEEKDAY_NAMES)]
+
 @client.tree.command(name='setup-auto-leaderboard', description='Sets up the automated weekly leaderboard system.')
+@app_commands.guild_only()
 @app_commands.describe(
     channel='The channel where the final leaderboard message will be sent.',
-    from_channel='The channel to count messages from (e.g., #general).',
+    from_channel='A channel to count messages from (e.g., #general).',
+    from_category='Count messages from every text channel in this category.',
     role='The role to clear and then give to the top members.',
-    top='The number of top users to fetch (e.g., 3). Must be 1 or more.'
+    top='The number of top users to fetch (e.g., 3). Must be 1 or more.',
+    schedule='When to post, as a UTC cron expression (default: "30 18 * * 6", Saturday 6:30 PM GMT).',
+    window='Which messages count towards the leaderboard (default: last 7 days).'
 )
+@app_commands.choices(window=WINDOW_CHOICES)
 @app_commands.default_permissions(administrator=True)
 async def setup_auto_leaderboard(
     interaction: discord.Interaction,
     channel: discord.TextChannel,
-    from_channel: discord.TextChannel,
     role: discord.Role,
-    top: int
+    top: int,
+    from_channel: Optional[discord.TextChannel] = None,
+    from_category: Optional[discord.CategoryChannel] = None,
+    schedule: Optional[str] = None,
+    window: Optional[app_commands.Choice[str]] = None
 ):
     if top < 1:
         await interaction.response.send_message('Top count must be 1 or more.', ephemeral=True)
         return
+    if not from_channel and not from_category:
+        await interaction.response.send_message('Pick a channel or a category to count messages from.', ephemeral=True)
+        return
 
-    timestamp = calculate_next_run_time()
+    schedule = schedule or DEFAULT_LEADERBOARD_SCHEDULE
+    try:
+        # Parsing alone accepts dates that never occur, such as 0 0 30 2 *
+        CronSchedule(schedule).next_after(datetime.now(timezone.utc))
+    except ValueError as error:
+        await interaction.response.send_message(f'Invalid schedule `{schedule}`: {error}', ephemeral=True)
+        return
 
-    db.set('setupComplete', True)
-    db.set('guildId', str(interaction.guild_id))
-    db.set('leaderboardChannelId', str(channel.id))
-    db.set('topRoleToGrantId', str(role.id))
-    db.set('topUserCount', top)
-    db.set('sourceChannelId', str(from_channel.id))
-    db.set('lastRunTimestamp', 0)
-    db.set('nextRunTimestamp', timestamp)
+    db.set_many(interaction.guild_id, {
+        'setupComplete': True,
+        'leaderboardChannelId': str(channel.id),
+        'topRoleToGrantId': str(role.id),
+        'topUserCount': top,
+        'sourceChannelIds': [str(from_channel.id)] if from_channel else [],
+        'sourceCategoryId': str(from_category.id) if from_category else None,
+        'leaderboardWindow': window.value if window else DEFAULT_COUNT_WINDOW,
+        'lastRunTimestamp': 0
+    })
+    job = await job_scheduler.schedule(interaction.guild_id, 'leaderboard', schedule)
 
-    next_run_date = datetime.fromtimestamp(timestamp/1000, timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    next_run_date = datetime.fromtimestamp(job.next_run/1000, timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT')
 
     await interaction.response.send_message(
         f'✅ Leaderboard setup complete!\n'
         f'- Leaderboard Channel: <#{channel.id}>\n'
-        f'- Messages Counted From: <#{from_channel.id}>\n'
+        f'- Messages Counted From: {describe_sources(source_channels(interaction.guild))}\n'
         f'- Top Users: {top}\n'
+        f'- Counting Window: {window.name if window else CountWindow.PRESETS[DEFAULT_COUNT_WINDOW][1]}\n'
         f'- Role to Grant: **{role.name}**\n'
-        f'- Next Scheduled Update: **{next_run_date}** (Saturday 6:30 PM GMT)',
+        f'- Next Scheduled Update: **{next_run_date}** (schedule `{schedule}`, UTC)',
+        ephemeral=True
+    )
+
+    for source_channel in source_channels(interaction.guild):
+        await message_counter.track(source_channel.id)
+        start_message_sync(source_channel)
+
+@client.tree.command(name='source-channel-add', description='Counts messages from another channel as well.')
+@app_commands.guild_only()
+@app_commands.describe(channel='The channel to start counting messages from.')
+@app_commands.default_permissions(administrator=True)
+async def source_channel_add(interaction: discord.Interaction, channel: discord.TextChannel):
+    if not db.get(interaction.guild_id, 'setupComplete', False):
+        await interaction.response.send_message(
+            'The auto-leaderboard is not yet set up. Please use `/setup-auto-leaderboard` first.', ephemeral=True
+        )
+        return
+
+    channel_ids = source_channel_ids(interaction.guild_id)
+    if channel.id not in channel_ids:
+        db.set(interaction.guild_id, 'sourceChannelIds', [str(channel_id) for channel_id in channel_ids + [channel.id]])
+
+    await interaction.response.send_message(
+        f'✅ Counting messages from: {describe_sources(source_channels(interaction.guild))}', ephemeral=True
+    )
+    await message_counter.track(channel.id)
+    start_message_sync(channel)
+
+@client.tree.command(name='source-channel-remove', description='Stops counting messages from a channel.')
+@app_commands.guild_only()
+@app_commands.describe(channel='The channel to stop counting messages from.')
+@app_commands.default_permissions(administrator=True)
+async def source_channel_remove(interaction: discord.Interaction, channel: discord.TextChannel):
+    channel_ids = source_channel_ids(interaction.guild_id)
+    if channel.id not in channel_ids:
+        category_id = db.get(interaction.guild_id, 'sourceCategoryId')
+        hint = ' It is counted through the source category.' if category_id and str(channel.category_id) == category_id else ''
+        await interaction.response.send_message(f'<#{channel.id}> is not a picked source channel.{hint}', ephemeral=True)
+        return
+
+    channel_ids.remove(channel.id)
+    db.set(interaction.guild_id, 'sourceChannelIds', [str(channel_id) for channel_id in channel_ids])
+    channels = source_channels(interaction.guild)
+    await interaction.response.send_message(
+        f'✅ Counting messages from: {describe_sources(channels)}' if channels
+        else '⚠️ No source channels are left; leaderboard updates will fail until one is added.',
         ephemeral=True
     )
 
 @client.tree.command(name='test-leaderboard', description='Manually runs the leaderboard update immediately for testing.')
+@app_commands.guild_only()
+@app_commands.describe(window='Counting window for this run (default: the configured one).')
+@app_commands.choices(window=WINDOW_CHOICES)
 @app_commands.default_permissions(administrator=True)
-async def test_leaderboard(interaction: discord.Interaction):
-    await run_leaderboard_update(client, True, interaction)
+async def test_leaderboard(interaction: discord.Interaction, window: Optional[app_commands.Choice[str]] = None):
+    await run_leaderboard_update(client, interaction.guild_id, True, interaction, window.value if window else None)
 
 @client.tree.command(name='leaderboard-timer', description='Shows the time remaining until the next scheduled leaderboard update.')
+@app_commands.guild_only()
 async def leaderboard_timer(interaction: discord.Interaction):
-    setup_complete = db.get('setupComplete', False)
+    setup_complete = db.get(interaction.guild_id, 'setupComplete', False)
 
     if not setup_complete:
         await interaction.response.send_message('The auto-leaderboard is not yet set up.', ephemeral=True)
         return
 
-    next_run_timestamp = db.get('nextRunTimestamp')
-    
-    if not next_run_timestamp:
-        await interaction.response.send_message('No scheduled run found. The bot will calculate on next check.', ephemeral=True)
+    job = job_scheduler.get_job(interaction.guild_id, 'leaderboard')
+
+    if not job or not job.enabled:
+        await interaction.response.send_message('No scheduled run found. Re-run `/setup-auto-leaderboard` to schedule one.', ephemeral=True)
         return
 
+    next_run_timestamp = job.next_run
     now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
-    
+
     if now_ms >= next_run_timestamp:
-        await interaction.response.send_message('⏰ The leaderboard is overdue and should run on the next check cycle (within 30 seconds).', ephemeral=True)
+        await interaction.response.send_message('⏰ The leaderboard is due and is running now.', ephemeral=True)
         return
 
     delay = next_run_timestamp - now_ms
@@ -569,115 +3209,467 @@ async def leaderboard_timer(interaction: discord.Interaction):
         f'(In **{days}** days, **{hours}** hours, **{minutes}** minutes, and **{seconds}** seconds).'
     )
 
-@client.tree.command(name='stats', description='Shows message statistics (total messages and top user) for the last 7 days.')
-async def stats(interaction: discord.Interaction):
-    setup_complete = db.get('setupComplete', False)
+@client.tree.command(name='scheduled-jobs', description='Lists the scheduled jobs for this server.')
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+async def scheduled_jobs(interaction: discord.Interaction):
+    jobs = job_scheduler.guild_jobs(interaction.guild_id)
 
-    if not setup_complete:
+    if not jobs:
+        await interaction.response.send_message('No jobs are scheduled for this server.', ephemeral=True)
+        return
+
+    format_time = lambda timestamp: f'<t:{timestamp // 1000}:f>' if timestamp else 'never'
+    lines = [
+        f'- **{job.kind}** `{job.schedule}`{"" if job.enabled else " (disabled)"}: '
+        f'next {format_time(job.next_run)}, last {format_time(job.last_run)}'
+        for job in jobs
+    ]
+
+    await interaction.response.send_message(
+        f'🗓️ **Scheduled Jobs ({len(jobs)}):**\n' + '\n'.join(lines),
+        ephemeral=True
+    )
+
+async def resolve_source_channels(interaction: discord.Interaction) -> List[discord.TextChannel]:
+    """The server's counted channels, replying with an error if message counting is not set up"""
+    if not db.get(interaction.guild_id, 'setupComplete', False):
         await interaction.response.send_message(
             'The auto-leaderboard is not yet set up. Please use `/setup-auto-leaderboard` first.',
             ephemeral=True
         )
-        return
-
-    await interaction.response.defer(ephemeral=True)
+        return []
 
-    source_channel_id = db.get('sourceChannelId')
-    guild = interaction.guild
-    source_channel = guild.get_channel(int(source_channel_id))
-
-    if not source_channel:
-        await interaction.followup.send(
-            'The source channel configured for message counting was not found. Please re-run `/setup-auto-leaderboard`.'
+    channels = source_channels(interaction.guild)
+    if not channels:
+        await interaction.response.send_message(
+            'None of the source channels configured for message counting were found. Please re-run `/setup-auto-leaderboard`.',
+            ephemeral=True
         )
-        return
+    return channels
 
+@client.tree.command(name='stats', description='Shows message statistics (total messages and top user) for a time window.')
+@app_commands.guild_only()
+@app_commands.describe(
+    window='Time window (default: last 7 days).',
+    start='First day of a custom range, as YYYY-MM-DD (UTC). Overrides window.',
+    end='Last day of a custom range, as YYYY-MM-DD (UTC; default: today).',
+    weekday='Only count messages sent on this weekday.'
+)
+@app_commands.choices(window=WINDOW_CHOICES, weekday=WEEKDAY_CHOICES)
+async def stats(interaction: discord.Interaction, window: Optional[app_commands.Choice[str]] = None,
+                start: Optional[str] = None, end: Optional[str] = None,
+                weekday: Optional[app_commands.Choice[int]] = None):
+    window_name = window.value if window else DEFAULT_COUNT_WINDOW
+    weekdays = {weekday.value} if weekday else None
     try:
-        message_counts = await get_weekly_message_counts(source_channel)
-        total_messages = sum(message_counts.values())
+        if start or end:
+            today = datetime.now(timezone.utc).date()
+            first_day = date.fromisoformat(start) if start else today - timedelta(days=6)
+            last_day = date.fromisoformat(end) if end else today
+            count_window = CountWindow.between(first_day, last_day, weekdays)
+        else:
+            count_window = CountWindow.preset(window_name, weekdays)
+    except ValueError as error:
+        await interaction.response.send_message(f'Invalid date range: {error}', ephemeral=True)
+        return
 
-        sorted_users = sorted(message_counts.items(), key=lambda x: x[1], reverse=True)
+    channels = await resolve_source_channels(interaction)
+    if not channels:
+        return
 
-        top_user_text = 'No active members found in the last 7 days.'
-        if sorted_users:
-            user_id, count = sorted_users[0]
-            top_user_text = f'<@{user_id}> with **{count}** messages.'
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
 
-        today = datetime.now(timezone.utc)
-        seven_days_ago = today - timedelta(days=7)
+    try:
+        if not (start or end or weekdays):
+            # Plain rolling windows are answered by the live ranking
+            ranking = await message_counter.get_ranking(channels, window_name)
+            total_messages = ranking.total_messages
+            top_users = ranking.top(1)
+        else:
+            message_counts = await get_message_counts(channels, count_window)
+            total_messages = sum(message_counts.values())
+            top_users = [max(message_counts.items(), key=lambda item: item[1])] if message_counts else []
+
+        top_user_text = 'No active members found in this period.'
+        if top_users:
+            user_id, count = top_users[0]
+            top_user_text = f'<@{user_id}> with **{count}** messages.'
 
-        format_date = lambda date: date.strftime('%b %d, %Y')
+        format_date = lambda moment: moment.strftime('%b %d, %Y')
+        # The window ends on an hour boundary; show the last day it covers
+        period_end = min(count_window.end, datetime.now(timezone.utc)) - timedelta(seconds=1)
 
-        stats_message = f'''📊 **Weekly Message Statistics**
-Period: **{format_date(seven_days_ago)}** to **{format_date(today)}** (Last 7 days)
+        stats_message = f'''📊 **Message Statistics**
+Period: **{format_date(count_window.start)}** to **{format_date(period_end)}** ({count_window.describe()})
 
-**Source Channel:** <#{source_channel.id}>
+**Source Channels:** {describe_sources(channels)}
 
 **Total Messages Sent:** **{total_messages}**
 **Most Active Member:** {top_user_text}'''
 
-        await interaction.followup.send(stats_message)
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(stats_message))
 
     except Exception as error:
-        print(f'Error during /stats command: {error}')
-        import traceback
-        traceback.print_exc()
-        await interaction.followup.send(f'An error occurred while fetching stats: `{error}`')
+        log.exception('Error during /stats command: %s', error)
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+            f'An error occurred while fetching stats: `{error}`'
+        ))
+
+@client.tree.command(name='rank', description="Shows a member's message rank in the counted channels.")
+@app_commands.guild_only()
+@app_commands.describe(user='Member to look up (default: you).', window='Time window (default: last 7 days).')
+@app_commands.choices(window=WINDOW_CHOICES)
+async def rank(interaction: discord.Interaction, user: Optional[discord.User] = None,
+               window: Optional[app_commands.Choice[str]] = None):
+    channels = await resolve_source_channels(interaction)
+    if not channels:
+        return
 
-@client.tree.command(name='setup-status', description='Configure the status tracker (Admin only)')
-@app_commands.describe(
-    channel='Channel containing the status message',
-    message_id='ID of the message to edit'
-)
-@app_commands.default_permissions(administrator=True)
-async def setup_status(interaction: discord.Interaction, channel: discord.TextChannel, message_id: str):
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
+
+    window_name = window.value if window else DEFAULT_COUNT_WINDOW
+    user = user or interaction.user
     try:
-        await channel.fetch_message(int(message_id))
+        ranking = await message_counter.get_ranking(channels, window_name)
+    except Exception as error:
+        log.exception('Error during /rank command: %s', error)
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+            f'An error occurred while fetching the ranking: `{error}`'
+        ))
+        return
+    standing = ranking.rank(user.id)
+    label = CountWindow.PRESETS[window_name][1].lower()
+
+    if not standing:
+        text = f'<@{user.id}> has no messages in {describe_sources(channels)} ({label}).'
+    else:
+        position, total = standing
+        text = (f'🏅 <@{user.id}> is ranked **#{position}** of {ranking.ranked_users} '
+                f'with **{total}** messages in {describe_sources(channels)} ({label}).')
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(text))
+
+@client.tree.command(name='leaderboard', description='Shows the current message leaderboard without changing any roles.')
+@app_commands.guild_only()
+@app_commands.describe(window='Time window (default: last 7 days).', top='Number of members to show (default: 10).')
+@app_commands.choices(window=WINDOW_CHOICES)
+async def leaderboard(interaction: discord.Interaction, window: Optional[app_commands.Choice[str]] = None,
+                      top: app_commands.Range[int, 1, 25] = 10):
+    channels = await resolve_source_channels(interaction)
+    if not channels:
+        return
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
+
+    window_name = window.value if window else DEFAULT_COUNT_WINDOW
+    try:
+        ranking = await message_counter.get_ranking(channels, window_name)
+    except Exception as error:
+        log.exception('Error during /leaderboard command: %s', error)
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+            f'An error occurred while fetching the leaderboard: `{error}`'
+        ))
+        return
+    label = CountWindow.PRESETS[window_name][1]
 
-        db.set('statusChannelId', str(channel.id))
-        db.set('statusMessageId', message_id)
+    if not ranking.ranked_users:
+        text = f'No messages in {describe_sources(channels)} ({label.lower()}).'
+    else:
+        lines = []
+        for user_id, total in ranking.top(top):
+            position, _ = ranking.rank(user_id)
+            lines.append(f'**#{position}** <@{user_id}> — {total} messages')
+        text = (f'📈 **Live Leaderboard** ({label}, {describe_sources(channels)})\n' + '\n'.join(lines) +
+                f'\n-# {ranking.total_messages} messages from {ranking.ranked_users} members')
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+        text, allowed_mentions=discord.AllowedMentions.none()
+    ))
+
+@client.tree.command(name='history', description="Shows a member's placements in past leaderboards.")
+@app_commands.guild_only()
+@app_commands.describe(user='Member to look up (default: you).', runs='Number of past leaderboards to show (default: 10).')
+async def history(interaction: discord.Interaction, user: Optional[discord.User] = None,
+                  runs: app_commands.Range[int, 1, 25] = 10):
+    user = user or interaction.user
+    # Acked first: the history read waits behind whatever the writer thread has queued
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
+    # One extra run so the oldest one shown still has a change to report
+    rows = await db.get_leaderboard_history(interaction.guild_id, user.id, runs + 1)
+    if not rows:
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send('No leaderboard has been posted yet.'))
+        return
 
+    lines = []
+    for (run_at, _, ranked_users, position, count), previous in zip(rows, rows[1:] + [None]):
+        day = datetime.fromtimestamp(run_at / 1000, timezone.utc).strftime('%b %d, %Y')
+        if position is None:
+            lines.append(f'**{day}** — not ranked')
+            continue
+
+        change = ''
+        if previous and previous[3] is not None:
+            places = previous[3] - position
+            movement = f'▲{places}' if places > 0 else f'▼{-places}' if places < 0 else '='
+            change = f' ({movement}, {count - previous[4]:+d} messages)'
+        elif previous:
+            change = ' (new)'
+        lines.append(f'**{day}** — **#{position}** of {ranked_users} with {count} messages{change}')
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+        f'🗓️ **Leaderboard history for <@{user.id}>**\n' + '\n'.join(lines[:runs]),
+        allowed_mentions=discord.AllowedMentions.none()
+    ))
+
+@client.tree.command(name='streak', description="Shows a member's run of top placements in past leaderboards.")
+@app_commands.guild_only()
+@app_commands.describe(user='Member to look up (default: you).')
+async def streak(interaction: discord.Interaction, user: Optional[discord.User] = None):
+    user = user or interaction.user
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
+    rows = await db.get_leaderboard_history(interaction.guild_id, user.id)
+    if not rows:
+        await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send('No leaderboard has been posted yet.'))
+        return
+
+    top_count = db.get(interaction.guild_id, 'topUserCount', 3)
+    positions = [row[3] for row in rows]
+    current, longest, total = placement_streaks(positions, top_count)
+    ranked = [position for position in positions if position is not None]
+    best = f'#{min(ranked)}' if ranked else 'never ranked'
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+        f'🔥 **Top {top_count} streak for <@{user.id}>**\n'
+        f'- Current streak: **{current}** leaderboard(s)\n'
+        f'- Longest streak: **{longest}** leaderboard(s)\n'
+        f'- Top {top_count} finishes: **{total}** of {len(rows)}\n'
+        f'- Best placement: **{best}**',
+        allowed_mentions=discord.AllowedMentions.none()
+    ))
+
+async def resolve_board(interaction: discord.Interaction, name: Optional[str]) -> Optional[StatusBoard]:
+    """Looks up the named board (or the server's first board), replying with an error if there is none"""
+    board = db.get_board(interaction.guild_id, name)
+    if not board:
+        missing = f'No status board named `{name}`' if name else 'This server has no status board'
         await interaction.response.send_message(
-            f'✅ Status tracker configured!\n- Channel: <#{channel.id}>\n- Message ID: {message_id}',
+            f'❌ {missing}. Use `/status-board-create` to add one.',
             ephemeral=True
         )
+    return board
 
-        await update_status(client)
-    except:
+@client.tree.command(name='setup-status', description='Configure the status tracker (Admin only)')
+@app_commands.guild_only()
+@app_commands.describe(
+    channel='Channel containing the status message',
+    message_id='ID of the message to edit',
+    board='Board to configure (default: main)'
+)
+@app_commands.default_permissions(administrator=True)
+async def setup_status(interaction: discord.Interaction, channel: discord.TextChannel, message_id: str,
+                       board: Optional[str] = None):
+    try:
+        await channel.fetch_message(int(message_id))
+    except (ValueError, discord.HTTPException):
         await interaction.response.send_message(
             f'❌ Could not find message with ID {message_id} in <#{channel.id}>. Please verify the message ID.',
             ephemeral=True
         )
+        return
+
+    name = board or DEFAULT_BOARD_NAME
+    status_board = db.get_board(interaction.guild_id, name)
+    stale_pages = None
+    if status_board:
+        # The old message's extra pages are deleted; the new message gets its own as needed
+        stale_pages = (status_board.channel_id, status_board.page_message_ids)
+        status_board.page_message_ids = []
+        status_board.channel_id = channel.id
+        status_board.message_id = int(message_id)
+        db.update_board(status_board)
+    else:
+        await db.create_board(interaction.guild_id, name, channel_id=channel.id, message_id=int(message_id))
+
+    await interaction.response.send_message(
+        f'✅ Status tracker configured!\n- Board: `{name}`\n- Channel: <#{channel.id}>\n- Message ID: {message_id}',
+        ephemeral=True
+    )
+
+    if stale_pages and stale_pages[1]:
+        await delete_page_messages(client, *stale_pages)
+    client.request_status_update(interaction.guild_id)
+
+@client.tree.command(name='status-board-create', description='Create an additional staff status board')
+@app_commands.guild_only()
+@app_commands.describe(
+    name='Short name used to refer to the board in other commands',
+    channel='Channel for the board',
+    message_id='Existing message (sent by this bot) to edit; leave empty to post a new one',
+    title='Embed title'
+)
+@app_commands.default_permissions(administrator=True)
+async def status_board_create(interaction: discord.Interaction, name: str, channel: discord.TextChannel,
+                              message_id: Optional[str] = None, title: Optional[str] = None):
+    if db.get_board(interaction.guild_id, name):
+        await interaction.response.send_message(f'❌ A status board named `{name}` already exists.', ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+
+    try:
+        if message_id:
+            message = await channel.fetch_message(int(message_id))
+        else:
+            message = await channel.send(embed=discord.Embed(color=0x808080, title=title or DEFAULT_BOARD_TITLE))
+    except (ValueError, discord.HTTPException) as error:
+        await interaction.followup.send(f'❌ Could not use a message in <#{channel.id}>: `{error}`')
+        return
+
+    guild = interaction.guild
+    await db.create_board(
+        interaction.guild_id, name, channel_id=channel.id, message_id=message.id, title=title,
+        author_name=guild.name, author_icon_url=guild.icon.url if guild.icon else None
+    )
+
+    await interaction.followup.send(
+        f'✅ Status board `{name}` created in <#{channel.id}> (message {message.id}).\n'
+        f'Add staff with `/staff-add board:{name}`.'
+    )
+
+    client.request_status_update(interaction.guild_id)
+
+@client.tree.command(name='status-board-remove', description='Delete a staff status board')
+@app_commands.guild_only()
+@app_commands.describe(name='Board to delete')
+@app_commands.default_permissions(administrator=True)
+async def status_board_remove(interaction: discord.Interaction, name: str):
+    board = await resolve_board(interaction, name)
+    if not board:
+        return
+
+    db.delete_board(board)
+    client.board_states.pop(board.board_id, None)
+
+    await interaction.response.send_message(f'✅ Deleted status board `{name}`.', ephemeral=True)
+    await delete_page_messages(client, board.channel_id, board.page_message_ids)
+
+    await update_presence(client)
+
+@client.tree.command(name='status-board-layout', description='Choose how a board groups its staff')
+@app_commands.guild_only()
+@app_commands.describe(
+    group_by='Group staff by availability or by their highest role',
+    name='Board to change (default: the first board)'
+)
+@app_commands.choices(group_by=[app_commands.Choice(name=grouping.title(), value=grouping)
+                                for grouping in StatusBoard.GROUPINGS])
+@app_commands.default_permissions(administrator=True)
+async def status_board_layout(interaction: discord.Interaction, group_by: app_commands.Choice[str],
+                              name: Optional[str] = None):
+    board = await resolve_board(interaction, name)
+    if not board:
+        return
+
+    board.group_by = group_by.value
+    db.update_board(board)
+    await interaction.response.send_message(f'✅ Board `{board.name}` now groups staff by {group_by.value}.', ephemeral=True)
+
+    client.request_status_update(interaction.guild_id)
+
+@client.tree.command(name='status-board-emojis', description='Set the status emojis used by a board')
+@app_commands.guild_only()
+@app_commands.describe(
+    online='Emoji for online staff',
+    idle='Emoji for idle staff',
+    dnd='Emoji for do-not-disturb staff',
+    offline='Emoji for offline staff',
+    name='Board to change (default: the first board)'
+)
+@app_commands.default_permissions(administrator=True)
+async def status_board_emojis(interaction: discord.Interaction, online: str, idle: str, dnd: str, offline: str,
+                              name: Optional[str] = None):
+    board = await resolve_board(interaction, name)
+    if not board:
+        return
+
+    board.emojis = {'online': online, 'idle': idle, 'dnd': dnd, 'offline': offline}
+    db.update_board(board)
+
+    await interaction.response.send_message(
+        f'✅ Updated emojis for `{board.name}`: {online} {idle} {dnd} {offline}',
+        ephemeral=True
+    )
+
+    client.request_status_update(interaction.guild_id)
+
+@client.tree.command(name='status-board-list', description='List the staff status boards in this server')
+@app_commands.guild_only()
+async def status_board_list(interaction: discord.Interaction):
+    boards = db.boards(interaction.guild_id)
+
+    if not boards:
+        await interaction.response.send_message('This server has no status boards.', ephemeral=True)
+        return
+
+    lines = [
+        f'- `{board.name}`: ' + (f'<#{board.channel_id}> (message {board.message_id})' if board.configured else '*not configured*')
+        + f', {len(board.staff_ids)} staff'
+        for board in boards
+    ]
+
+    await interaction.response.send_message(
+        f'📋 **Status Boards ({len(boards)}):**\n' + '\n'.join(lines),
+        ephemeral=True
+    )
 
 @client.tree.command(name='staff-add', description='Add a staff member to the status tracker')
-@app_commands.describe(user='The user to add as staff')
+@app_commands.guild_only()
+@app_commands.describe(user='The user to add as staff', board='Board to add them to (default: the first board)')
 @app_commands.default_permissions(administrator=True)
-async def staff_add(interaction: discord.Interaction, user: discord.User):
-    db.add_staff_member(str(user.id))
+async def staff_add(interaction: discord.Interaction, user: discord.User, board: Optional[str] = None):
+    status_board = db.get_board(interaction.guild_id, board)
+    if not status_board and board is None:
+        # Staff can be listed before the status message is configured
+        status_board = await db.create_board(interaction.guild_id, DEFAULT_BOARD_NAME)
+    if not status_board:
+        await resolve_board(interaction, board)
+        return
+
+    db.add_board_staff(status_board, user.id)
+    client.absent_staff_ids.get(interaction.guild_id, set()).discard(user.id)
 
     await interaction.response.send_message(
-        f'✅ Added <@{user.id}> to staff tracking.',
+        f'✅ Added <@{user.id}> to staff tracking on `{status_board.name}`.',
         ephemeral=True
     )
 
-    await update_status(client)
+    client.request_status_update(interaction.guild_id)
 
 @client.tree.command(name='staff-remove', description='Remove a staff member from the status tracker')
-@app_commands.describe(user='The user to remove from staff')
+@app_commands.guild_only()
+@app_commands.describe(user='The user to remove from staff', board='Board to remove them from (default: the first board)')
 @app_commands.default_permissions(administrator=True)
-async def staff_remove(interaction: discord.Interaction, user: discord.User):
-    db.remove_staff_member(str(user.id))
+async def staff_remove(interaction: discord.Interaction, user: discord.User, board: Optional[str] = None):
+    status_board = await resolve_board(interaction, board)
+    if not status_board:
+        return
+
+    db.remove_board_staff(status_board, user.id)
 
     await interaction.response.send_message(
-        f'✅ Removed <@{user.id}> from staff tracking.',
+        f'✅ Removed <@{user.id}> from staff tracking on `{status_board.name}`.',
         ephemeral=True
     )
 
-    await update_status(client)
+    client.request_status_update(interaction.guild_id)
 
 @client.tree.command(name='staff-list', description='List all staff members being tracked')
-async def staff_list(interaction: discord.Interaction):
-    staff_ids = db.get_staff_ids()
+@app_commands.guild_only()
+@app_commands.describe(board='Board to list (default: the first board)')
+async def staff_list(interaction: discord.Interaction, board: Optional[str] = None):
+    status_board = db.get_board(interaction.guild_id, board)
+    staff_ids = status_board.staff_ids if status_board else set()
 
     if len(staff_ids) == 0:
         await interaction.response.send_message(
@@ -686,13 +3678,119 @@ async def staff_list(interaction: discord.Interaction):
         )
         return
 
-    staff_list_text = '\n'.join([f'<@{user_id}>' for user_id in staff_ids])
+    staff_list_text = '\n'.join([f'<@{user_id}>' for user_id in sorted(staff_ids)])
 
     await interaction.response.send_message(
-        f'📋 **Staff Members Being Tracked ({len(staff_ids)}):**\n{staff_list_text}',
+        f'📋 **Staff Members Being Tracked on `{status_board.name}` ({len(staff_ids)}):**\n{staff_list_text}',
         ephemeral=True
     )
 
+def format_hours(seconds: int) -> str:
+    return f'{seconds / 3600:.1f}h'
+
+@client.tree.command(name='staff-hours', description='Shows how long each tracked staff member was available.')
+@app_commands.guild_only()
+@app_commands.describe(board='Board whose staff to report (default: the first board)',
+                       days='Number of days to cover, including today (default: 7)')
+@app_commands.default_permissions(administrator=True)
+async def staff_hours(interaction: discord.Interaction, board: Optional[str] = None,
+                      days: app_commands.Range[int, 1, 365] = 7):
+    status_board = await resolve_board(interaction, board)
+    if not status_board:
+        return
+    if not status_board.staff_ids:
+        await interaction.response.send_message('No staff members are currently being tracked.', ephemeral=True)
+        return
+
+    # Acked first: the flush drains the writer thread's queue
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
+    await presence_tracker.flush()
+    since_day = int(time.time()) // 86400 - days + 1
+    totals = await db.get_presence_totals(interaction.guild_id, status_board.staff_ids, since_day)
+
+    rows = sorted(status_board.staff_ids, key=lambda user_id: -sum(totals.get(user_id, (0, 0, 0))[:2]))
+    lines = []
+    for user_id in rows:
+        online, idle, dnd = totals.get(user_id, (0, 0, 0))
+        lines.append(f'<@{user_id}> — **{format_hours(online + idle)}** available '
+                     f'({format_hours(online)} online, {format_hours(idle)} idle) · {format_hours(dnd)} dnd')
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+        f'⏱️ **Staff hours on `{status_board.name}`** (last {days} days, UTC)\n' + '\n'.join(lines),
+        allowed_mentions=discord.AllowedMentions.none()
+    ))
+
+COVERAGE_SHADES = ' ░▒▓█'
+
+@client.tree.command(name='staff-coverage', description='Shows a heatmap of staff availability by weekday and hour.')
+@app_commands.guild_only()
+@app_commands.describe(board='Board whose staff to report (default: the first board)',
+                       days='Number of days to cover, including today (default: 28)')
+@app_commands.default_permissions(administrator=True)
+async def staff_coverage(interaction: discord.Interaction, board: Optional[str] = None,
+                         days: app_commands.Range[int, 7, 365] = 28):
+    status_board = await resolve_board(interaction, board)
+    if not status_board:
+        return
+    if not status_board.staff_ids:
+        await interaction.response.send_message('No staff members are currently being tracked.', ephemeral=True)
+        return
+
+    # Acked first: the flush drains the writer thread's queue
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.response.defer(ephemeral=True))
+    await presence_tracker.flush()
+    now = int(time.time())
+    now_hour = now // 3600
+    since_hour = (now_hour // 24 - days + 1) * 24
+    coverage = await db.get_presence_coverage(interaction.guild_id, status_board.staff_ids, since_hour)
+
+    # Average number of staff available in each (weekday, hour of day) slot; day 0 of the epoch was a Thursday
+    available = [[0] * 24 for _ in range(7)]
+    elapsed = [[0] * 24 for _ in range(7)]
+    for hour in range(since_hour, now_hour + 1):
+        weekday, hour_of_day = (hour // 24 + 3) % 7, hour % 24
+        available[weekday][hour_of_day] += coverage.get(hour, 0)
+        elapsed[weekday][hour_of_day] += min(3600, now - hour * 3600)  # The current hour is still running
+    average = [[available[day][hour] / elapsed[day][hour] if elapsed[day][hour] else 0.0 for hour in range(24)]
+               for day in range(7)]
+
+    peak = max(max(row) for row in average)
+    def shade(value: float) -> str:
+        if not peak or not value:
+            return COVERAGE_SHADES[0] * 2
+        return COVERAGE_SHADES[max(1, round(value / peak * (len(COVERAGE_SHADES) - 1)))] * 2
+
+    header = ('    ' + ''.join(f'{hour:<6}' for hour in range(0, 24, 3))).rstrip()
+    grid = [f'{WEEKDAY_NAMES[day][:3]} ' + ''.join(shade(value) for value in average[day]) for day in range(7)]
+    quietest = min(((day, hour) for day in range(7) for hour in range(24)), key=lambda slot: average[slot[0]][slot[1]])
+
+    await rest_queue.call(PRIORITY_INTERACTION, lambda: interaction.followup.send(
+        f'🗺️ **Staff coverage on `{status_board.name}`** (last {days} days, UTC hours)\n'
+        f'```\n{header}\n' + '\n'.join(grid) + '\n```\n'
+        f'█ = {peak:.1f} staff available on average (busiest slot). '
+        f'Quietest: {WEEKDAY_NAMES[quietest[0]]} {quietest[1]:02d}:00 '
+        f'({average[quietest[0]][quietest[1]]:.1f} staff).'
+    ))
+
+@client.tree.command(name='sync-commands', description='Re-uploads the application commands to Discord (Owner only).')
+@app_commands.default_permissions(administrator=True)
+async def sync_commands(interaction: discord.Interaction):
+    if str(interaction.user.id) != OWNER_ID:
+        await interaction.response.send_message(
+            '🚫 Permission denied. Only the designated owner can use this command.',
+            ephemeral=True
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    try:
+        await client.sync_commands(force=True)
+    except discord.HTTPException as error:
+        log.exception('Command sync failed: %s', error)
+        await interaction.followup.send(f'Command sync failed: `{error}`')
+        return
+    await interaction.followup.send(f'✅ Synced {len(client.tree.get_commands())} application commands.')
+
 @client.tree.command(name='shutdown', description='Shuts down the bot (Owner only).')
 @app_commands.default_permissions(administrator=True)
 async def shutdown(interaction: discord.Interaction):
@@ -704,26 +3802,20 @@ async def shutdown(interaction: discord.Interaction):
         return
 
     await interaction.response.send_message('👋 Shutting down bot. Goodbye!')
-
-    print(f'[ADMIN] Shutdown initiated by user ID: {interaction.user.id}')
-
-    if client.scheduler_checker.is_running():
-        client.scheduler_checker.cancel()
-        print('[SCHEDULER] Scheduler checker stopped.')
-
-    db.close()
-
-    await client.close()
+    await client.shutdown(f'requested by user ID {interaction.user.id}')
 
 # --- MAIN ---
 
 if __name__ == '__main__':
     try:
-        client.run(DISCORD_BOT_TOKEN)
+        client.run(DISCORD_BOT_TOKEN, log_handler=None)  # Logging is configured by setup_logging
     except KeyboardInterrupt:
-        print('\n[SHUTDOWN] Received SIGINT, closing database...')
+        log.info('Received SIGINT, closing database...')
         db.close()
     except Exception as e:
-        print(f'❌ Failed to log in to Discord: {e}')
+        log.critical('Failed to log in to Discord: %s', e)
         db.close()
-        exit(1)
\ No newline at end of file
+        exit(1)
+    finally:
+        # Drain any queued writes before the process exits
+        db.close()
\ No newline at end of file
@@ -0,0 +1,410 @@
+"""Offline benchmark for the bot's hot paths.
+
+Runs update_status, get_message_counts and run_leaderboard_update
+against an in-process stand-in for a Discord guild, with simulated REST
+latency and 429 responses, and reports wall time, REST calls and peak
+memory per operation.
+
+    python bench.py --members 5000 --staff 40 --messages 200000 --latency 80 --rate-limit 0.02
+"""
+import os
+import json
+import logging
+import random
+import shutil
+import asyncio
+import argparse
+import bisect
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+# app.py reads its configuration at import time
+BENCH_DIR = tempfile.mkdtemp(prefix='status-bench-')
+os.environ.setdefault('DISCORD_BOT_TOKEN', 'bench')
+os.environ.setdefault('DISCORD_CLIENT_ID', '0')
+os.environ['DATABASE_PATH'] = os.path.join(BENCH_DIR, 'bench.db')
+os.environ['METRICS_PORT'] = '0'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import app
+
+import discord
+
+GUILD_ID = 424242
+SOURCE_CHANNEL_ID = 1101
+BOARD_CHANNEL_ID = 1002
+LEADERBOARD_CHANNEL_ID = 1003
+BOARD_MESSAGE_ID = 2001
+TOP_ROLE_ID = 3001
+STATUSES = ('online', 'idle', 'dnd', 'offline')
+
+# --- FAKE DISCORD ---
+
+class FakeRest:
+    """Simulated REST transport: latency, 429s (waited out and retried like discord.py) and call counts"""
+
+    def __init__(self, latency: float, jitter: float, rate_limit: float, retry_after: float, rng: random.Random):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.rng = rng
+        self.calls: Dict[str, int] = {}
+        self.rate_limited = 0
+        self.rate_limit_wait = 0.0
+
+    def reset(self):
+        self.calls = {}
+        self.rate_limited = 0
+        self.rate_limit_wait = 0.0
+
+    async def call(self, route: str):
+        while True:
+            self.calls[route] = self.calls.get(route, 0) + 1
+            await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+            if self.rng.random() >= self.rate_limit:
+                return
+            self.rate_limited += 1
+            self.rate_limit_wait += self.retry_after
+            await asyncio.sleep(self.retry_after)
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str, bot: bool = False):
+        self.id = user_id
+        self.name = name
+        self.bot = bot
+
+class FakeMessage:
+    def __init__(self, message_id: int, author: FakeUser, channel: 'FakeChannel'):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+
+    @property
+    def created_at(self) -> datetime:
+        return discord.utils.snowflake_time(self.id)
+
+class FakePartialMessage:
+    def __init__(self, channel: 'FakeChannel', message_id: int):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **fields):
+        await self.channel.rest.call('PATCH /channels/{channel_id}/messages/{message_id}')
+        return self
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str, rest: FakeRest):
+        self.id = channel_id
+        self.name = name
+        self.rest = rest
+        self.message_ids: List[int] = []
+        self.authors: List[FakeUser] = []
+
+    def fill(self, authors: List[FakeUser], count: int, days: int, rng: random.Random):
+        """Spreads count messages by random authors over the last days days"""
+        now = datetime.now(timezone.utc)
+        start = discord.utils.time_snowflake(now - timedelta(days=days))
+        end = discord.utils.time_snowflake(now - timedelta(seconds=1))
+        self.message_ids = sorted(rng.sample(range(start, end), count))
+        self.authors = [rng.choice(authors) for _ in range(count)]
+
+    def get_partial_message(self, message_id: int) -> FakePartialMessage:
+        return FakePartialMessage(self, message_id)
+
+    async def send(self, content=None, **fields):
+        await self.rest.call('POST /channels/{channel_id}/messages')
+        return FakePartialMessage(self, discord.utils.time_snowflake(datetime.now(timezone.utc)))
+
+    async def history(self, limit=None, after=None, before=None, oldest_first=True):
+        low = bisect.bisect_right(self.message_ids, after.id) if after else 0
+        high = bisect.bisect_left(self.message_ids, before.id) if before else len(self.message_ids)
+        for page_start in range(low, high, app.HISTORY_PAGE_SIZE):
+            await self.rest.call('GET /channels/{channel_id}/messages')
+            for index in range(page_start, min(page_start + app.HISTORY_PAGE_SIZE, high)):
+                yield FakeMessage(self.message_ids[index], self.authors[index], self)
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+        self.holders: Dict[int, 'FakeMember'] = {}
+
+    @property
+    def members(self) -> List['FakeMember']:
+        return list(self.holders.values())
+
+class FakeMember(FakeUser):
+    def __init__(self, user_id: int, name: str, status: str, rest: FakeRest):
+        super().__init__(user_id, name)
+        self.status = status
+        self.rest = rest
+        self.roles: Dict[int, FakeRole] = {}
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles.get(role_id)
+
+    def grant(self, role: FakeRole):
+        role.holders[self.id] = self
+        self.roles[role.id] = role
+
+    def revoke(self, role: FakeRole):
+        role.holders.pop(self.id, None)
+        self.roles.pop(role.id, None)
+
+    async def add_roles(self, role: FakeRole, reason: Optional[str] = None):
+        await self.rest.call('PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}')
+        self.grant(role)
+
+    async def remove_roles(self, role: FakeRole, reason: Optional[str] = None):
+        await self.rest.call('DELETE /guilds/{guild_id}/members/{user_id}/roles/{role_id}')
+        self.revoke(role)
+
+class FakeGuild:
+    """A guild whose member cache holds only part of its members, like one without chunking"""
+
+    def __init__(self, guild_id: int, rest: FakeRest):
+        self.id = guild_id
+        self.name = 'Bench Guild'
+        self.icon = None
+        self.rest = rest
+        self.members: Dict[int, FakeMember] = {}
+        self.cached: Dict[int, FakeMember] = {}
+        self.channels: Dict[int, FakeChannel] = {}
+        self.roles: Dict[int, FakeRole] = {}
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self.cached.get(user_id)
+
+    async def fetch_member(self, user_id: int) -> FakeMember:
+        await self.rest.call('GET /guilds/{guild_id}/members/{user_id}')
+        if user_id not in self.members:
+            raise discord.NotFound(FakeResponse(404), 'Unknown Member')
+        return self.members[user_id]
+
+    async def query_members(self, user_ids=None, limit=5, presences=False, cache=True) -> List[FakeMember]:
+        # A gateway request, so it is not counted as REST
+        await asyncio.sleep(self.rest.latency)
+        found = [self.members[user_id] for user_id in user_ids if user_id in self.members]
+        if cache:
+            self.cached.update((member.id, member) for member in found)
+        return found
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles.get(role_id)
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = 'Not Found'
+
+class FakeBot:
+    """Just enough of DiscordBot for the status and leaderboard code paths"""
+
+    board_state = app.DiscordBot.board_state
+
+    def __init__(self, guild: FakeGuild):
+        self.guild = guild
+        self.board_states: Dict[int, app.BoardState] = {}
+        self.absent_staff_ids = {}
+        self.status_lock = asyncio.Lock()
+        self.presence_text = None
+        self.presence_updates = 0
+
+    def is_ready(self) -> bool:
+        return True
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self.guild if guild_id == self.guild.id else None
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.guild.get_channel(channel_id)
+
+    async def fetch_channel(self, channel_id: int) -> FakeChannel:
+        await self.guild.rest.call('GET /channels/{channel_id}')
+        return self.guild.channels[channel_id]
+
+    async def change_presence(self, **fields):
+        self.presence_updates += 1
+
+# --- SCENARIO ---
+
+async def build_world(args, rest: FakeRest, rng: random.Random) -> FakeBot:
+    guild = FakeGuild(GUILD_ID, rest)
+    for index in range(args.members):
+        member = FakeMember(10_000 + index, f'member{index}', rng.choice(STATUSES), rest)
+        guild.members[member.id] = member
+        if rng.random() < args.cached:
+            guild.cached[member.id] = member
+
+    # Source channels get consecutive ids and an equal share of the messages
+    members = list(guild.members.values())
+    for index in range(args.source_channels):
+        source = FakeChannel(SOURCE_CHANNEL_ID + index, f'general-{index}', rest)
+        source.fill(members, args.messages // args.source_channels, args.days, rng)
+        guild.channels[source.id] = source
+    for channel in (FakeChannel(BOARD_CHANNEL_ID, 'staff-status', rest),
+                    FakeChannel(LEADERBOARD_CHANNEL_ID, 'leaderboard', rest)):
+        guild.channels[channel.id] = channel
+    guild.roles[TOP_ROLE_ID] = FakeRole(TOP_ROLE_ID, 'Top Chatter')
+
+    board = await app.db.create_board(GUILD_ID, 'bench', channel_id=BOARD_CHANNEL_ID, message_id=BOARD_MESSAGE_ID)
+    with app.db.batch():
+        for user_id in rng.sample(sorted(guild.members), args.staff):
+            app.db.add_board_staff(board, user_id)
+    app.db.set_many(GUILD_ID, {
+        'setupComplete': True,
+        'leaderboardChannelId': str(LEADERBOARD_CHANNEL_ID),
+        'sourceChannelIds': [str(SOURCE_CHANNEL_ID + index) for index in range(args.source_channels)],
+        'topRoleToGrantId': str(TOP_ROLE_ID),
+        'topUserCount': 3
+    })
+    await app.db.flush()
+    return FakeBot(guild)
+
+def churn_presences(bot: FakeBot, fraction: float, rng: random.Random):
+    for member in rng.sample(list(bot.guild.members.values()), int(len(bot.guild.members) * fraction)):
+        member.status = rng.choice(STATUSES)
+
+def stale_role_holders(bot: FakeBot, count: int, rng: random.Random):
+    role = bot.guild.roles[TOP_ROLE_ID]
+    for member in role.members:
+        member.revoke(role)
+    for member in rng.sample(list(bot.guild.members.values()), count):
+        member.grant(role)
+
+async def status_update(bot: FakeBot):
+    await app.update_status(bot, GUILD_ID)
+
+def window_counts(window: str, weekdays=None):
+    async def operation(bot: FakeBot):
+        await app.get_message_counts(app.source_channels(bot.guild), app.CountWindow.preset(window, weekdays))
+    return operation
+
+async def rank_lookup(bot: FakeBot):
+    ranking = await app.message_counter.get_ranking(app.source_channels(bot.guild), app.DEFAULT_COUNT_WINDOW)
+    for user_id in list(bot.guild.members)[:100]:
+        ranking.rank(user_id)
+    ranking.top(10)
+
+async def leaderboard(bot: FakeBot):
+    await app.run_leaderboard_update(bot, GUILD_ID)
+
+def operations(args, rng: random.Random) -> list:
+    """(name, operation, setup before each run, runs) in execution order"""
+    clear_counts = lambda bot: app.counts_cache._entries.clear()
+    return [
+        ('status_cold', status_update, None, 1),
+        ('status_unchanged', status_update, None, args.iterations),
+        ('status_churn', status_update, lambda bot: churn_presences(bot, args.churn, rng), args.iterations),
+        ('counts_backfill', window_counts('7d'), None, 1),
+        ('counts_7d', window_counts('7d'), clear_counts, args.iterations),
+        ('counts_30d', window_counts('30d'), clear_counts, args.iterations),
+        ('counts_weekday', window_counts('30d', {5, 6}), clear_counts, args.iterations),
+        ('counts_cached', window_counts('7d'), None, args.iterations),
+        ('rank_lookup', rank_lookup, None, args.iterations),
+        ('leaderboard', leaderboard, lambda bot: (clear_counts(bot), stale_role_holders(bot, args.role_holders, rng)),
+         args.iterations),
+    ]
+
+async def measure(bot: FakeBot, rest: FakeRest, operation, setup, runs: int) -> dict:
+    walls = []
+    peaks = []
+    rest.reset()
+    for _ in range(runs):
+        if setup:
+            setup(bot)
+        tracemalloc.start()
+        start = time.perf_counter()
+        await operation(bot)
+        walls.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        'runs': runs,
+        'wall_mean_ms': statistics.mean(walls) * 1000,
+        'wall_max_ms': max(walls) * 1000,
+        'rest_calls': sum(rest.calls.values()) / runs,
+        'rest_routes': {route: count / runs for route, count in sorted(rest.calls.items())},
+        'rate_limited': rest.rate_limited / runs,
+        'rate_limit_wait_s': rest.rate_limit_wait / runs,
+        'peak_kib': max(peaks) / 1024,
+    }
+
+def print_report(results: Dict[str, dict]):
+    header = f'{"operation":<18}{"runs":>6}{"mean ms":>11}{"max ms":>11}{"REST/run":>10}{"429/run":>9}{"peak KiB":>11}'
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        print(f'{name:<18}{result["runs"]:>6}{result["wall_mean_ms"]:>11.1f}{result["wall_max_ms"]:>11.1f}'
+              f'{result["rest_calls"]:>10.1f}{result["rate_limited"]:>9.2f}{result["peak_kib"]:>11.0f}')
+    print()
+    for name, result in results.items():
+        for route, count in result['rest_routes'].items():
+            print(f'{name:<18}{count:>8.1f}  {route}')
+
+async def main(args):
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    rng = random.Random(args.seed)
+    rest = FakeRest(args.latency / 1000, args.jitter / 1000, args.rate_limit, args.retry_after, rng)
+    bot = await build_world(args, rest, rng)
+
+    results = {}
+    selected = set(args.only.split(',')) if args.only else None
+    for name, operation, setup, runs in operations(args, rng):
+        if selected and name not in selected:
+            continue
+        results[name] = await measure(bot, rest, operation, setup, runs)
+
+    app.rest_queue.stop()
+    await app.db.flush()
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the status bot against a simulated guild.')
+    parser.add_argument('--members', type=int, default=2000, help='guild members')
+    parser.add_argument('--cached', type=float, default=0.5, help='fraction of members in the member cache')
+    parser.add_argument('--staff', type=int, default=25, help='staff on the status board')
+    parser.add_argument('--messages', type=int, default=50000, help='messages across all source channels')
+    parser.add_argument('--source-channels', type=int, default=1, help='channels the messages are spread over')
+    parser.add_argument('--days', type=int, default=30, help='days the messages span')
+    parser.add_argument('--role-holders', type=int, default=50, help='stale top-role holders before each leaderboard run')
+    parser.add_argument('--churn', type=float, default=0.1, help='fraction of members changing status between churn runs')
+    parser.add_argument('--latency', type=float, default=50, help='simulated REST latency in ms')
+    parser.add_argument('--jitter', type=float, default=10, help='latency jitter in ms')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='probability a REST call returns 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='seconds a 429 asks to wait')
+    parser.add_argument('--iterations', type=int, default=5, help='runs of each repeatable operation')
+    parser.add_argument('--only', help='comma-separated operations to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own log output")
+    args = parser.parse_args(argv)
+    args.staff = min(args.staff, args.members)
+    args.role_holders = min(args.role_holders, args.members)
+    args.messages = max(args.messages, 0)
+    args.source_channels = max(args.source_channels, 1)
+    return args
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    try:
+        report = asyncio.run(main(arguments))
+    finally:
+        app.db.close()
+        logging.shutdown()
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    if arguments.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)